@@ -0,0 +1,95 @@
+import threading
+from datetime import datetime
+
+# --------------------------
+# Hot state for events being scanned right now
+# --------------------------
+# Holds each active event's date and today's cutoff as datetimes plus the
+# USNs already timed in / out today, so scan_attendance() can decide between
+# "Already timed in", a Late insert and a time-out update in memory. The
+# upserts in app.attendance still guard the table, so a stale set can only
+# cost an extra round trip, never a duplicate row.
+
+MAX_ACTIVE_EVENTS = 32
+
+
+class ActiveEventState:
+    def __init__(self, event_id, event_date, cutoff_time, day):
+        self.event_id = event_id
+        self.day = day
+        self.event_date = datetime.strptime(event_date, "%Y-%m-%d") if event_date else None
+        self.cutoff_time = cutoff_time
+        self.cutoff_dt = None
+        if cutoff_time:
+            cutoff = datetime.strptime(cutoff_time, "%H:%M")  # parse 24-hour
+            self.cutoff_dt = datetime.strptime(day, "%Y-%m-%d").replace(hour=cutoff.hour, minute=cutoff.minute)
+        self.timed_in = set()
+        self.timed_out = set()
+
+    def after_cutoff(self, now):
+        return self.cutoff_dt is not None and now > self.cutoff_dt
+
+    def load(self, cur):
+        cur.execute(
+            "SELECT usn, time_out FROM event_attendance WHERE event_id=? AND date=?",
+            (self.event_id, self.day)
+        )
+        for row in cur.fetchall():
+            self.timed_in.add(row["usn"])
+            if row["time_out"]:
+                self.timed_out.add(row["usn"])
+        return self
+
+    def mark(self, usn, time_out=None):
+        self.timed_in.add(usn)
+        if time_out:
+            self.timed_out.add(usn)
+
+
+class ActiveEvents:
+    def __init__(self, max_events=MAX_ACTIVE_EVENTS):
+        self.max_events = max_events
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def get(self, cur, event_id, now=None):
+        """Return the state for event_id on now's date, warming it from the DB if needed."""
+        day = (now or datetime.now()).strftime("%Y-%m-%d")
+        with self._lock:
+            state = self._states.get(event_id)
+        if state is not None and state.day == day:
+            return state
+
+        cur.execute("SELECT event_date, cutoff_time FROM events WHERE id=?", (event_id,))
+        event = cur.fetchone()
+        if not event:
+            self.invalidate(event_id)
+            return None
+        state = ActiveEventState(event_id, event["event_date"], event["cutoff_time"], day).load(cur)
+
+        with self._lock:
+            self._states[event_id] = state
+            if len(self._states) > self.max_events:
+                # Drop the oldest warmed event (dicts keep insertion order)
+                del self._states[next(iter(self._states))]
+        return state
+
+    def warm(self, cur, event_id):
+        """Load (or reload) the state when the attendance page opens."""
+        self.invalidate(event_id)
+        return self.get(cur, event_id)
+
+    def invalidate(self, event_id):
+        with self._lock:
+            self._states.pop(event_id, None)
+
+    def forget_student(self, usn):
+        # Deleting a student cascades away their attendance rows
+        with self._lock:
+            states = list(self._states.values())
+        for state in states:
+            state.timed_in.discard(usn)
+            state.timed_out.discard(usn)
+
+
+active_events = ActiveEvents()
@@ -0,0 +1,94 @@
+from datetime import datetime
+from app.roster import roster_cache
+from app.active_event import active_events
+from app.writer import scan_writer
+
+# --------------------------
+# Scan logic shared by the single and batch scan endpoints
+# --------------------------
+VALID_ACTIONS = ("time_in", "time_out")
+
+
+def record_scan(cur, event_id, barcode, action, now=None):
+    """
+    Apply one time-in / time-out scan on an open cursor without committing.
+    Returns (body, status) the way the routes return jsonify payloads:
+    {"record": {...}} on success, {"error": "..."} otherwise.
+    """
+    if action not in VALID_ACTIONS:
+        return {"error": "Invalid action"}, 400
+
+    # Validate student (served from the roster cache after the first scan)
+    student = roster_cache.get(cur, barcode)
+    if not student:
+        return {"error": "Student not found"}, 404
+
+    try:
+        event_id = int(event_id)
+    except (TypeError, ValueError):
+        return {"error": "Event not found"}, 404
+
+    now = now or datetime.now()
+    today = now.strftime("%Y-%m-%d")
+    current_time_str = now.strftime("%H:%M")  # store as 24-hour for consistency
+
+    # Event date, cutoff and today's timed-in set come from memory once warmed
+    state = active_events.get(cur, event_id, now)
+    if state is None:
+        return {"error": "Event not found"}, 404
+
+    if action == "time_in":
+        if state.after_cutoff(now):
+            return {"error": "⚠ Attendance cutoff time reached. Cannot time in."}, 400
+        if student["usn"] in state.timed_in:
+            return {"error": "Already timed in today"}, 400
+
+        # The unique (event_id, usn, date) index still rejects a second
+        # time-in atomically if another worker got there first.
+        cur.execute("""
+            INSERT INTO event_attendance (event_id, usn, date, time_in)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (event_id, usn, date) DO NOTHING
+            RETURNING time_in, time_out
+        """, (event_id, barcode, today, current_time_str))
+        row = cur.fetchone()
+        if not row:
+            state.mark(student["usn"])
+            return {"error": "Already timed in today"}, 400
+
+    else:
+        # No time-in yet -> insert as 'Late'; otherwise just stamp the time-out.
+        cur.execute("""
+            INSERT INTO event_attendance (event_id, usn, date, time_in, time_out)
+            VALUES (?, ?, ?, 'Late', ?)
+            ON CONFLICT (event_id, usn, date) DO UPDATE SET time_out = excluded.time_out
+            RETURNING time_in, time_out
+        """, (event_id, barcode, today, current_time_str))
+        row = cur.fetchone()
+
+    state.mark(student["usn"], row["time_out"])
+
+    return {
+        "record": {
+            "usn": student["usn"],
+            "name": student["name"],
+            "date": today,
+            "time_in": row["time_in"],
+            "time_out": row["time_out"] or ""
+        }
+    }, 200
+
+
+def submit_scan(job, event_ids=()):
+    """
+    Run job(cur) on the group-commit writer and wait for its result.
+    Raises writer.QueueFull when the writer is backed up.
+    """
+    future = scan_writer.submit(job)
+    try:
+        return future.result()
+    except Exception:
+        # The group was rolled back, so in-memory marks may be ahead of the table
+        for event_id in event_ids:
+            active_events.invalidate(event_id)
+        raise
@@ -0,0 +1,304 @@
+"""
+Multi-worker support: the Socket.IO message queue and cross-worker cache invalidation.
+
+    python -m app.cluster --port 5099     # loopback broker for local testing
+"""
+import argparse
+import os
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+import socketio
+
+from app.active_event import active_events
+from app.roster import roster_cache
+
+# --------------------------
+# Message queue
+# --------------------------
+# With OSAS_MESSAGE_QUEUE set, every worker's SocketIO uses a pub/sub client
+# manager, so an emit on one worker reaches the browsers connected to all of
+# them. redis:// is the production backend. loopback://host:port is a
+# stand-in for testing: a small fan-out broker on a local TCP port, started
+# in-process by `run.py --workers N` or on its own with `python -m app.cluster`.
+#
+# The same channel carries cache invalidations. Each worker keeps its own
+# roster_cache and active_events, so student and event edits go through the
+# invalidate_* helpers below, which clear the local entry and tell the
+# other workers to do the same.
+
+DEFAULT_BROKER_PORT = 5099
+CHANNEL = "flask-socketio"
+INVALIDATE = "osas_invalidate"
+PUBLISH, SUBSCRIBE = b"P", b"S"
+
+_header = struct.Struct("!I")
+_manager = None  # this worker's client manager, set by create_manager()
+
+
+def _send_frame(sock, payload):
+    sock.sendall(_header.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        data += chunk
+    return data
+
+
+def _read_frames(sock):
+    while True:
+        (size,) = _header.unpack(_recv_exact(sock, _header.size))
+        yield _recv_exact(sock, size)
+
+
+# --------------------------
+# Loopback broker
+# --------------------------
+class LoopbackBroker:
+    """Forward every frame a publisher sends to all connected subscribers."""
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_BROKER_PORT):
+        self.host = host
+        self.port = port
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def start(self):
+        """Bind and serve from a background thread; returns the bound port."""
+        self._listener = socket.create_server((self.host, self.port))
+        self.port = self._listener.getsockname()[1]
+        threading.Thread(target=self.serve_forever, name="mq-broker", daemon=True).start()
+        return self.port
+
+    def serve_forever(self):
+        if self._listener is None:
+            self._listener = socket.create_server((self.host, self.port))
+        while True:
+            conn, _ = self._listener.accept()
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        try:
+            role = _recv_exact(conn, 1)
+            if role == SUBSCRIBE:
+                with self._lock:
+                    self._subscribers.add(conn)
+                # Subscribers never send; block until they hang up
+                while conn.recv(1):
+                    pass
+            else:
+                for frame in _read_frames(conn):
+                    self._fan_out(frame)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            with self._lock:
+                self._subscribers.discard(conn)
+            conn.close()
+
+    def _fan_out(self, frame):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                _send_frame(sub, frame)
+            except OSError:
+                with self._lock:
+                    self._subscribers.discard(sub)
+
+
+# --------------------------
+# Client managers
+# --------------------------
+class CacheSyncMixin:
+    """Peel cache invalidations off the Socket.IO channel and apply them locally."""
+
+    def publish_invalidation(self, kind, keys):
+        self._publish({"method": INVALIDATE, "kind": kind, "keys": list(keys), "host_id": self.host_id})
+
+    def _listen(self):
+        for message in super()._listen():
+            data = message
+            if not isinstance(message, dict):
+                try:
+                    data = self.json.loads(message)
+                except ValueError:
+                    yield message
+                    continue
+            if isinstance(data, dict) and data.get("method") == INVALIDATE:
+                if data.get("host_id") != self.host_id:
+                    _apply_invalidation(data.get("kind"), data.get("keys") or [])
+                continue
+            yield data
+
+
+class _LoopbackBackend(socketio.PubSubManager):
+    name = "loopback"
+
+    def __init__(self, url, channel=CHANNEL, write_only=False, logger=None, json=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        parsed = urlparse(url)
+        self.address = (parsed.hostname or "127.0.0.1", parsed.port or DEFAULT_BROKER_PORT)
+        self._pub = None
+        self._pub_lock = threading.Lock()
+
+    def _connect(self, role):
+        sock = socket.create_connection(self.address)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.sendall(role)
+        return sock
+
+    def _publish(self, data):
+        payload = self.json.dumps(data).encode()
+        with self._pub_lock:
+            for retries_left in (1, 0):
+                try:
+                    if self._pub is None:
+                        self._pub = self._connect(PUBLISH)
+                    _send_frame(self._pub, payload)
+                    return
+                except OSError as e:
+                    self._pub = None
+                    if not retries_left:
+                        self._get_logger().error("Cannot publish to loopback broker %s: %s", self.address, e)
+
+    def _listen(self):
+        while True:
+            try:
+                sock = self._connect(SUBSCRIBE)
+                yield from _read_frames(sock)
+            except OSError as e:
+                self._get_logger().error("Loopback broker %s unavailable (%s), retrying in 1s", self.address, e)
+                time.sleep(1)
+
+
+class LoopbackManager(CacheSyncMixin, _LoopbackBackend):
+    pass
+
+
+class RedisManager(CacheSyncMixin, socketio.RedisManager):
+    pass
+
+
+def create_manager(url, channel=CHANNEL):
+    """Client manager for OSAS_MESSAGE_QUEUE; also the target of invalidate_* broadcasts."""
+    global _manager
+    scheme = urlparse(url).scheme
+    if scheme == "loopback":
+        _manager = LoopbackManager(url, channel=channel)
+    elif scheme in ("redis", "rediss", "unix"):
+        _manager = RedisManager(url, channel=channel)
+    else:
+        raise ValueError(f"Unsupported OSAS_MESSAGE_QUEUE {url!r} (use redis:// or loopback://)")
+    return _manager
+
+
+def subscribe(socketio):
+    """
+    Start the manager's listener now instead of on the first Socket.IO
+    connect, so a worker that only serves HTTP scanners still hears
+    invalidations from the others.
+    """
+    server = socketio.server
+    if not server.manager_initialized:
+        server.manager_initialized = True
+        server.manager.initialize()
+
+
+# --------------------------
+# Cross-worker cache invalidation
+# --------------------------
+def _apply_invalidation(kind, keys):
+    if kind == "event":
+        for event_id in keys:
+            active_events.invalidate(int(event_id))
+    elif kind == "students":
+        roster_cache.invalidate(*keys)
+    elif kind == "roster":
+        roster_cache.clear()
+    elif kind == "forget_student":
+        for usn in keys:
+            active_events.forget_student(usn)
+
+
+def _invalidate(kind, *keys):
+    _apply_invalidation(kind, keys)
+    if _manager is not None:
+        _manager.publish_invalidation(kind, keys)
+
+
+def invalidate_event(event_id):
+    """An event's date or cutoff changed (or it was deleted)."""
+    _invalidate("event", int(event_id))
+
+
+def invalidate_students(*usns):
+    _invalidate("students", *usns)
+
+
+def clear_roster():
+    """Bulk roster change: drop every cached student on every worker."""
+    _invalidate("roster")
+
+
+def forget_student(usn):
+    """A student was deleted along with their attendance rows."""
+    _invalidate("forget_student", usn)
+
+
+# --------------------------
+# Worker launcher
+# --------------------------
+# `python run.py --workers N` starts N copies of run.py on consecutive ports.
+# Socket.IO's polling transport needs every request of a session to reach
+# the same worker, so the balancer in front must be sticky, e.g. nginx:
+#
+#     upstream osas { ip_hash; server 127.0.0.1:5050; server 127.0.0.1:5051; }
+#
+# Without OSAS_MESSAGE_QUEUE the launcher hosts a loopback broker itself.
+
+def run_workers(script, count, host, port, message_queue=None):
+    if not message_queue:
+        broker = LoopbackBroker(port=0)
+        message_queue = f"loopback://127.0.0.1:{broker.start()}"
+    env = dict(os.environ, OSAS_MESSAGE_QUEUE=message_queue)
+
+    workers = [
+        subprocess.Popen([sys.executable, script, "--worker", "--host", host, "--port", str(port + i)], env=env)
+        for i in range(count)
+    ]
+    print(f"{count} workers on {host}:{port}-{port + count - 1}, message queue {message_queue}")
+    try:
+        for proc in workers:
+            proc.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proc in workers:
+            proc.terminate()
+        for proc in workers:
+            proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Loopback Socket.IO message queue for local multi-worker testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_BROKER_PORT)
+    args = parser.parse_args()
+    print(f"Loopback broker on loopback://{args.host}:{args.port}")
+    LoopbackBroker(args.host, args.port).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import csv
+import io
+import os
+import shutil
+import tempfile
+
+import xlsxwriter
+
+# --------------------------
+# Streaming attendance export
+# --------------------------
+# Rows go from the cursor straight into the output, FETCH_SIZE at a time, so
+# an export never holds more than one chunk in memory. The xlsx is written by
+# xlsxwriter in constant_memory mode (each row is flushed to a temp file as
+# soon as the next one starts) with the 'Late' highlight applied as the cell
+# is written; the CSV is a generator the response sends chunk by chunk.
+
+FETCH_SIZE = 500
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+COLUMN_WIDTH = 20
+
+EVENT_COLUMNS = ["USN", "Name", "Date", "Time In", "Time Out"]
+RANGE_COLUMNS = ["Event", "Event Date"] + EVENT_COLUMNS
+
+
+class ExportScope:
+    """Which attendance rows an export covers: one event, or a date range / semester."""
+
+    def __init__(self, event_id=None, start=None, end=None, semester=None):
+        self.event_id = event_id
+        self.start = start or None
+        self.end = end or None
+        self.semester = semester or None
+
+    @property
+    def single_event(self):
+        return self.event_id is not None
+
+    @property
+    def columns(self):
+        return EVENT_COLUMNS if self.single_event else RANGE_COLUMNS
+
+    def query(self):
+        if self.single_event:
+            return """
+                SELECT ea.usn, si.name, ea.date, ea.time_in, ea.time_out
+                FROM event_attendance ea
+                JOIN student_info si ON ea.usn = si.usn
+                WHERE ea.event_id = ?
+                ORDER BY si.name
+            """, (self.event_id,)
+
+        where, params = [], []
+        if self.start:
+            where.append("e.event_date >= ?")
+            params.append(self.start)
+        if self.end:
+            where.append("e.event_date <= ?")
+            params.append(self.end)
+        if self.semester:
+            where.append("e.semester = ?")
+            params.append(self.semester)
+        return f"""
+            SELECT e.event_name, e.event_date, ea.usn, si.name, ea.date, ea.time_in, ea.time_out
+            FROM events e
+            JOIN event_attendance ea ON ea.event_id = e.id
+            JOIN student_info si ON ea.usn = si.usn
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY e.event_date, e.id, si.name
+        """, params
+
+    def filename(self, ext):
+        if self.single_event:
+            return f"Attendance_Event_{self.event_id}.{ext}"
+        parts = ["Attendance"]
+        if self.semester:
+            parts.append(f"{self.semester}_Semester")
+        if self.start or self.end:
+            parts.append(f"{self.start or 'start'}_to_{self.end or 'end'}")
+        if len(parts) == 1:
+            parts.append("All")
+        return "_".join(parts) + f".{ext}"
+
+
+def iter_rows(cur):
+    while True:
+        rows = cur.fetchmany(FETCH_SIZE)
+        if not rows:
+            return
+        yield from rows
+
+
+def open_export(cur, scope):
+    """Run the export query and return (first_row, rows) or (None, None) when empty."""
+    sql, params = scope.query()
+    cur.execute(sql, params)
+    rows = iter_rows(cur)
+    first = next(rows, None)
+    if first is None:
+        return None, None
+    return first, rows
+
+
+def write_xlsx(path, columns, first, rows):
+    workbook = xlsxwriter.Workbook(path, {
+        "constant_memory": True,
+        "tmpdir": os.path.dirname(path),
+    })
+    worksheet = workbook.add_worksheet("Attendance")
+
+    # Header formatting
+    header_format = workbook.add_format({
+        'bold': True,
+        'bg_color': '#2E2E2E',
+        'font_color': 'white',
+        'border': 1
+    })
+    # Highlight late Time In cells
+    late_format = workbook.add_format({
+        'bg_color': '#FFA500',
+        'font_color': 'black'
+    })
+
+    worksheet.set_column(0, len(columns) - 1, COLUMN_WIDTH)
+    worksheet.write_row(0, 0, columns, header_format)
+
+    time_in_col = columns.index("Time In")
+    row_num = 1
+    for row in _chain(first, rows):
+        for col_num, value in enumerate(row):
+            if value is None:
+                continue
+            if col_num == time_in_col and value == 'Late':
+                worksheet.write_string(row_num, col_num, value, late_format)
+            else:
+                worksheet.write(row_num, col_num, value)
+        row_num += 1
+
+    workbook.close()
+    return path
+
+
+def xlsx_tempfile(scope):
+    """Return (path, cleanup) for a workbook in its own temp directory."""
+    tmpdir = tempfile.mkdtemp(prefix="osas_export_")
+    path = os.path.join(tmpdir, scope.filename("xlsx"))
+    return path, lambda: shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def file_chunks(path, size=64 * 1024):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def csv_chunks(columns, first, rows):
+    """Yield the CSV a FETCH_SIZE block of rows at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens the file as UTF-8
+    buffer.write("\ufeff")
+    writer.writerow(columns)
+    pending = 0
+    for row in _chain(first, rows):
+        writer.writerow(tuple(row))
+        pending += 1
+        if pending >= FETCH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def _chain(first, rows):
+    yield first
+    yield from rows
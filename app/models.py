@@ -0,0 +1,461 @@
+import os
+import sqlite3
+import threading
+from collections import deque
+
+from app.offload import run_blocking, wrap_connection
+
+DB_PATH = os.environ.get("OSAS_DB_PATH", "osas_attendance.db")
+
+# --------------------------
+# Connection settings
+# --------------------------
+POOL_SIZE = int(os.environ.get("OSAS_DB_POOL_SIZE", "16"))
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 256
+
+PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    "PRAGMA synchronous = NORMAL",     # safe with WAL, one fsync per checkpoint
+    "PRAGMA cache_size = -16000",      # ~16 MB page cache per connection
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 134217728",    # 128 MB
+)
+
+
+def _connect(path):
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=False,
+    )
+    conn.row_factory = sqlite3.Row
+    # WAL lets readers (dashboard) run while a scanner is writing
+    conn.execute("PRAGMA journal_mode = WAL")
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class PooledConnection:
+    """
+    Thin proxy over sqlite3.Connection; close() hands it back to the pool.
+    Calls are forwarded through app.offload so they run off the eventlet hub.
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._raw = conn
+        self._conn = wrap_connection(conn)
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed connection.")
+        return getattr(self._conn, name)
+
+    def close(self):
+        if self._conn is not None:
+            self._pool.release(self._raw)
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._conn is not None:
+            if exc_type is None:
+                self._conn.commit()
+            else:
+                self._conn.rollback()
+        self.close()
+        return False
+
+
+class ConnectionPool:
+    """
+    LIFO pool of configured connections. Each greenlet checks out its own
+    connection for the length of a request, so prepared statements and the
+    page cache survive between requests instead of being rebuilt per connect.
+    """
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        conn = None
+        with self._lock:
+            if self._idle:
+                conn = self._idle.pop()
+        if conn is None:
+            conn = run_blocking(_connect, self.path)
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                run_blocking(conn.rollback)
+        except sqlite3.Error:
+            conn.close()
+            return
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            while self._idle:
+                self._idle.pop().close()
+
+
+_pool = ConnectionPool(DB_PATH)
+
+
+def get_db_connection():
+    return _pool.acquire()
+
+
+# --------------------------
+# Schema migrations
+# --------------------------
+def _dedupe_event_attendance(conn):
+    # Older builds could double-insert a scan; keep the first row per
+    # (event_id, usn, date), carrying over a time_out from a later duplicate.
+    conn.execute("""
+        UPDATE event_attendance
+        SET time_out = (
+            SELECT MAX(d.time_out) FROM event_attendance d
+            WHERE d.event_id = event_attendance.event_id
+              AND d.usn = event_attendance.usn
+              AND d.date = event_attendance.date
+        )
+        WHERE (time_out IS NULL OR time_out = '')
+          AND id IN (
+            SELECT MIN(id) FROM event_attendance
+            GROUP BY event_id, usn, date HAVING COUNT(*) > 1
+          )
+    """)
+    conn.execute("""
+        DELETE FROM event_attendance
+        WHERE id NOT IN (SELECT MIN(id) FROM event_attendance GROUP BY event_id, usn, date)
+    """)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_name TEXT NOT NULL,
+    event_date TEXT NOT NULL,
+    semester TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS student_info (
+    usn TEXT PRIMARY KEY,          -- Use TEXT to safely store long IDs like 22000745800
+    name TEXT NOT NULL,
+    course TEXT NOT NULL,
+    contact TEXT
+);
+
+CREATE TABLE IF NOT EXISTS event_attendance (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_id INTEGER NOT NULL,
+    usn TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time_in TEXT,
+    time_out TEXT,
+    FOREIGN KEY (event_id) REFERENCES events (id) ON DELETE CASCADE,
+    FOREIGN KEY (usn) REFERENCES student_info (usn) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS user_accounts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL UNIQUE,
+    password TEXT NOT NULL,
+    user_type TEXT NOT NULL CHECK(user_type IN ('admin', 'officer')),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+
+# Per-event rollup maintained by triggers, so the dashboard and /event listing
+# read one row per event instead of aggregating event_attendance. Triggers
+# also fire for the cascading deletes from events and student_info.
+EVENT_STATS_SCHEMA = """
+CREATE TABLE event_stats (
+    event_id INTEGER PRIMARY KEY,
+    present INTEGER NOT NULL DEFAULT 0,
+    late INTEGER NOT NULL DEFAULT 0,
+    no_time_out INTEGER NOT NULL DEFAULT 0,
+    records INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT INTO event_stats (event_id, present, late, no_time_out, records)
+SELECT event_id,
+       SUM(time_in IS NOT NULL AND time_in NOT IN ('', 'Absent', 'Late')),
+       SUM(time_in IS 'Late'),
+       SUM(time_in IS NOT NULL AND time_in != '' AND IFNULL(time_out, '') = ''),
+       COUNT(*)
+FROM event_attendance
+GROUP BY event_id;
+
+CREATE TRIGGER IF NOT EXISTS trg_event_stats_insert AFTER INSERT ON event_attendance
+BEGIN
+    INSERT INTO event_stats (event_id) VALUES (NEW.event_id) ON CONFLICT (event_id) DO NOTHING;
+    UPDATE event_stats SET
+        present = present + (NEW.time_in IS NOT NULL AND NEW.time_in NOT IN ('', 'Absent', 'Late')),
+        late = late + (NEW.time_in IS 'Late'),
+        no_time_out = no_time_out + (NEW.time_in IS NOT NULL AND NEW.time_in != '' AND IFNULL(NEW.time_out, '') = ''),
+        records = records + 1
+    WHERE event_id = NEW.event_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_event_stats_delete AFTER DELETE ON event_attendance
+BEGIN
+    UPDATE event_stats SET
+        present = present - (OLD.time_in IS NOT NULL AND OLD.time_in NOT IN ('', 'Absent', 'Late')),
+        late = late - (OLD.time_in IS 'Late'),
+        no_time_out = no_time_out - (OLD.time_in IS NOT NULL AND OLD.time_in != '' AND IFNULL(OLD.time_out, '') = ''),
+        records = records - 1
+    WHERE event_id = OLD.event_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_event_stats_update AFTER UPDATE OF event_id, time_in, time_out ON event_attendance
+BEGIN
+    UPDATE event_stats SET
+        present = present - (OLD.time_in IS NOT NULL AND OLD.time_in NOT IN ('', 'Absent', 'Late')),
+        late = late - (OLD.time_in IS 'Late'),
+        no_time_out = no_time_out - (OLD.time_in IS NOT NULL AND OLD.time_in != '' AND IFNULL(OLD.time_out, '') = ''),
+        records = records - 1
+    WHERE event_id = OLD.event_id;
+    INSERT INTO event_stats (event_id) VALUES (NEW.event_id) ON CONFLICT (event_id) DO NOTHING;
+    UPDATE event_stats SET
+        present = present + (NEW.time_in IS NOT NULL AND NEW.time_in NOT IN ('', 'Absent', 'Late')),
+        late = late + (NEW.time_in IS 'Late'),
+        no_time_out = no_time_out + (NEW.time_in IS NOT NULL AND NEW.time_in != '' AND IFNULL(NEW.time_out, '') = ''),
+        records = records + 1
+    WHERE event_id = NEW.event_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_event_stats_event_delete AFTER DELETE ON events
+BEGIN
+    DELETE FROM event_stats WHERE event_id = OLD.id;
+END;
+"""
+
+
+# Per-student twin of event_stats, for profile pages and bulk reports such as
+# the at-risk list that would otherwise rescan attendance per student.
+STUDENT_STATS_SCHEMA = """
+CREATE TABLE student_stats (
+    usn TEXT PRIMARY KEY,
+    present INTEGER NOT NULL DEFAULT 0,
+    late INTEGER NOT NULL DEFAULT 0,
+    no_time_out INTEGER NOT NULL DEFAULT 0,
+    records INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT INTO student_stats (usn, present, late, no_time_out, records)
+SELECT usn,
+       SUM(time_in IS NOT NULL AND time_in NOT IN ('', 'Absent', 'Late')),
+       SUM(time_in IS 'Late'),
+       SUM(time_in IS NOT NULL AND time_in != '' AND IFNULL(time_out, '') = ''),
+       COUNT(*)
+FROM event_attendance
+GROUP BY usn;
+
+CREATE TRIGGER IF NOT EXISTS trg_student_stats_insert AFTER INSERT ON event_attendance
+BEGIN
+    INSERT INTO student_stats (usn) VALUES (NEW.usn) ON CONFLICT (usn) DO NOTHING;
+    UPDATE student_stats SET
+        present = present + (NEW.time_in IS NOT NULL AND NEW.time_in NOT IN ('', 'Absent', 'Late')),
+        late = late + (NEW.time_in IS 'Late'),
+        no_time_out = no_time_out + (NEW.time_in IS NOT NULL AND NEW.time_in != '' AND IFNULL(NEW.time_out, '') = ''),
+        records = records + 1
+    WHERE usn = NEW.usn;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_student_stats_delete AFTER DELETE ON event_attendance
+BEGIN
+    UPDATE student_stats SET
+        present = present - (OLD.time_in IS NOT NULL AND OLD.time_in NOT IN ('', 'Absent', 'Late')),
+        late = late - (OLD.time_in IS 'Late'),
+        no_time_out = no_time_out - (OLD.time_in IS NOT NULL AND OLD.time_in != '' AND IFNULL(OLD.time_out, '') = ''),
+        records = records - 1
+    WHERE usn = OLD.usn;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_student_stats_update AFTER UPDATE OF usn, time_in, time_out ON event_attendance
+BEGIN
+    UPDATE student_stats SET
+        present = present - (OLD.time_in IS NOT NULL AND OLD.time_in NOT IN ('', 'Absent', 'Late')),
+        late = late - (OLD.time_in IS 'Late'),
+        no_time_out = no_time_out - (OLD.time_in IS NOT NULL AND OLD.time_in != '' AND IFNULL(OLD.time_out, '') = ''),
+        records = records - 1
+    WHERE usn = OLD.usn;
+    INSERT INTO student_stats (usn) VALUES (NEW.usn) ON CONFLICT (usn) DO NOTHING;
+    UPDATE student_stats SET
+        present = present + (NEW.time_in IS NOT NULL AND NEW.time_in NOT IN ('', 'Absent', 'Late')),
+        late = late + (NEW.time_in IS 'Late'),
+        no_time_out = no_time_out + (NEW.time_in IS NOT NULL AND NEW.time_in != '' AND IFNULL(NEW.time_out, '') = ''),
+        records = records + 1
+    WHERE usn = NEW.usn;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_student_stats_student_delete AFTER DELETE ON student_info
+BEGIN
+    DELETE FROM student_stats WHERE usn = OLD.usn;
+END;
+"""
+
+# Full-text index over the roster for the student list search API. It is an
+# external-content table, so the text lives only in student_info and the
+# triggers keep the index in step with it.
+STUDENT_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE student_fts USING fts5(
+    usn, name, course,
+    content='student_info', content_rowid='rowid',
+    prefix='2 3'
+);
+
+INSERT INTO student_fts (student_fts) VALUES ('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS trg_student_fts_insert AFTER INSERT ON student_info
+BEGIN
+    INSERT INTO student_fts (rowid, usn, name, course) VALUES (NEW.rowid, NEW.usn, NEW.name, NEW.course);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_student_fts_delete AFTER DELETE ON student_info
+BEGIN
+    INSERT INTO student_fts (student_fts, rowid, usn, name, course) VALUES ('delete', OLD.rowid, OLD.usn, OLD.name, OLD.course);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_student_fts_update AFTER UPDATE OF usn, name, course ON student_info
+BEGIN
+    INSERT INTO student_fts (student_fts, rowid, usn, name, course) VALUES ('delete', OLD.rowid, OLD.usn, OLD.name, OLD.course);
+    INSERT INTO student_fts (rowid, usn, name, course) VALUES (NEW.rowid, NEW.usn, NEW.name, NEW.course);
+END;
+"""
+
+# Change counter per semester, bumped by any write that can alter that
+# semester's report. Cached semester workbooks are keyed on it, so a report
+# is rebuilt only after its data actually changed. Roster edits touch every
+# semester's matrix and bump them all.
+SEMESTER_VERSION_SCHEMA = """
+CREATE TABLE semester_versions (
+    semester TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT INTO semester_versions (semester) SELECT DISTINCT semester FROM events;
+
+CREATE TRIGGER IF NOT EXISTS trg_semester_version_attendance_insert AFTER INSERT ON event_attendance
+BEGIN
+    UPDATE semester_versions SET version = version + 1
+    WHERE semester = (SELECT semester FROM events WHERE id = NEW.event_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_semester_version_attendance_delete AFTER DELETE ON event_attendance
+BEGIN
+    UPDATE semester_versions SET version = version + 1
+    WHERE semester = (SELECT semester FROM events WHERE id = OLD.event_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_semester_version_attendance_update AFTER UPDATE ON event_attendance
+BEGIN
+    UPDATE semester_versions SET version = version + 1
+    WHERE semester IN (SELECT semester FROM events WHERE id IN (OLD.event_id, NEW.event_id));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_semester_version_event_insert AFTER INSERT ON events
+BEGIN
+    INSERT INTO semester_versions (semester) VALUES (NEW.semester)
+    ON CONFLICT (semester) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_semester_version_event_update AFTER UPDATE ON events
+BEGIN
+    INSERT INTO semester_versions (semester) VALUES (NEW.semester) ON CONFLICT (semester) DO NOTHING;
+    UPDATE semester_versions SET version = version + 1 WHERE semester IN (OLD.semester, NEW.semester);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_semester_version_event_delete AFTER DELETE ON events
+BEGIN
+    UPDATE semester_versions SET version = version + 1 WHERE semester = OLD.semester;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_semester_version_student_insert AFTER INSERT ON student_info
+BEGIN
+    UPDATE semester_versions SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_semester_version_student_delete AFTER DELETE ON student_info
+BEGIN
+    UPDATE semester_versions SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_semester_version_student_update AFTER UPDATE OF usn, name, course ON student_info
+BEGIN
+    UPDATE semester_versions SET version = version + 1;
+END;
+"""
+
+
+def _exists(conn, kind, name):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type=? AND name=?", (kind, name)
+    ).fetchone() is not None
+
+
+def init_db(path=None):
+    """Create missing tables and bring an existing database up to the schema the routes expect."""
+    conn = _connect(path or DB_PATH)
+    try:
+        conn.executescript(SCHEMA)
+        cols = {row["name"] for row in conn.execute("PRAGMA table_info(events)")}
+        if "cutoff_time" not in cols:
+            conn.execute("ALTER TABLE events ADD COLUMN cutoff_time TEXT")
+
+        # Roster sync: hash of the row as last imported, and when a student
+        # dropped off the roster (kept, with their history, but can't scan)
+        cols = {row["name"] for row in conn.execute("PRAGMA table_info(student_info)")}
+        if "roster_hash" not in cols:
+            conn.execute("ALTER TABLE student_info ADD COLUMN roster_hash TEXT")
+        if "retired_at" not in cols:
+            conn.execute("ALTER TABLE student_info ADD COLUMN retired_at TEXT")
+
+        if not _exists(conn, "index", "ux_event_attendance_event_usn_date"):
+            _dedupe_event_attendance(conn)
+            conn.execute("""
+                CREATE UNIQUE INDEX ux_event_attendance_event_usn_date
+                ON event_attendance (event_id, usn, date)
+            """)
+        # Keyset pagination of the /event listing walks (event_date, id)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_events_date_id ON events (event_date, id)")
+        # ...and the student list walks (name, usn), optionally within a course
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_student_info_name_usn ON student_info (name, usn)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_student_info_course_name_usn ON student_info (course, name, usn)")
+        # Profile pages look a student's attendance up by usn
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_event_attendance_usn_event ON event_attendance (usn, event_id)")
+        conn.commit()
+
+        if not _exists(conn, "table", "event_stats"):
+            # executescript commits first, so table, backfill and triggers
+            # go in one explicit transaction
+            conn.executescript("BEGIN;" + EVENT_STATS_SCHEMA + "COMMIT;")
+
+        if not _exists(conn, "table", "student_stats"):
+            conn.executescript("BEGIN;" + STUDENT_STATS_SCHEMA + "COMMIT;")
+
+        if not _exists(conn, "table", "student_fts"):
+            conn.executescript("BEGIN;" + STUDENT_FTS_SCHEMA + "COMMIT;")
+
+        if not _exists(conn, "table", "semester_versions"):
+            conn.executescript("BEGIN;" + SEMESTER_VERSION_SCHEMA + "COMMIT;")
+    finally:
+        conn.close()
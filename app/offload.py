@@ -0,0 +1,55 @@
+import os
+import sqlite3
+
+# --------------------------
+# Executor for blocking work under eventlet
+# --------------------------
+# sqlite3 calls and werkzeug's password hashing are C / CPU work that never
+# yields to the eventlet hub, so one slow query or a burst of logins freezes
+# every Socket.IO connection. With offloading on, that work runs in
+# eventlet's native thread pool (eventlet.tpool) while the hub keeps serving.
+#
+#   OSAS_OFFLOAD=auto    tpool when eventlet has monkey-patched threads (default)
+#   OSAS_OFFLOAD=tpool   always use eventlet.tpool
+#   OSAS_OFFLOAD=inline  run in the calling greenlet (debugging / plain threads)
+#
+# The pool size is eventlet's own EVENTLET_THREADPOOL_SIZE (default 20).
+
+OFFLOAD_MODE = os.environ.get("OSAS_OFFLOAD", "auto").lower()
+
+_tpool = None
+
+
+def _get_tpool():
+    """Return eventlet.tpool when offloading is enabled, else None (decided once)."""
+    global _tpool
+    if _tpool is None:
+        _tpool = False
+        if OFFLOAD_MODE in ("auto", "tpool"):
+            try:
+                from eventlet import patcher, tpool
+            except ImportError:
+                tpool = None
+            if tpool is not None and (OFFLOAD_MODE == "tpool" or patcher.is_monkey_patched("thread")):
+                _tpool = tpool
+    return _tpool or None
+
+
+def run_blocking(fn, *args, **kwargs):
+    """Run fn(*args, **kwargs) off the hub and return its result."""
+    tpool = _get_tpool()
+    if tpool is None:
+        return fn(*args, **kwargs)
+    return tpool.execute(fn, *args, **kwargs)
+
+
+def wrap_connection(conn):
+    """Proxy a sqlite3 connection so every call (and its cursors) runs off the hub."""
+    tpool = _get_tpool()
+    if tpool is None:
+        return conn
+    return tpool.Proxy(conn, autowrap=(sqlite3.Cursor,))
+
+
+def mode():
+    return "tpool" if _get_tpool() else "inline"
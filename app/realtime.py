@@ -0,0 +1,91 @@
+import threading
+
+from flask import session
+from flask_socketio import join_room
+
+# --------------------------
+# Socket.IO rooms and coalesced broadcasts
+# --------------------------
+# Pages join the room they display: event_attendance.html joins its
+# "event:<id>" room and events.html the shared "events" room, so a scan is
+# only pushed to the browsers watching that event. High-rate updates go
+# through the Broadcaster, which collects them per (message, room) for
+# COALESCE_WINDOW seconds and sends each batch as a single array message.
+
+COALESCE_WINDOW = 0.05
+EVENTS_ROOM = "events"
+
+
+def event_room(event_id):
+    return f"event:{int(event_id)}"
+
+
+class Broadcaster:
+    def __init__(self, window=COALESCE_WINDOW):
+        self.window = window
+        self.socketio = None
+        self._pending = {}
+        self._scheduled = False
+        self._lock = threading.Lock()
+        # metrics
+        self.items = 0
+        self.messages = 0
+
+    def init_app(self, socketio):
+        self.socketio = socketio
+
+    def publish(self, message, room, item):
+        """Queue item for the next `message` frame sent to room."""
+        if self.socketio is None:
+            return
+        with self._lock:
+            self._pending.setdefault((message, room), []).append(item)
+            self.items += 1
+            schedule = not self._scheduled
+            self._scheduled = True
+        if schedule:
+            self.socketio.start_background_task(self._flush_later)
+
+    def _flush_later(self):
+        self.socketio.sleep(self.window)
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._scheduled = False
+            self.messages += len(pending)
+        for (message, room), items in pending.items():
+            self.socketio.emit(message, items, to=room)
+
+    def stats(self):
+        return {
+            "items": self.items,
+            "messages": self.messages,
+            "avg_items_per_message": round(self.items / self.messages, 2) if self.messages else 0,
+        }
+
+
+broadcaster = Broadcaster()
+
+
+def register_handlers(socketio):
+    """Room joins; pages call these on every (re)connect."""
+
+    @socketio.on("join_event")
+    def join_event(data):
+        if "user_id" not in session:
+            return False
+        try:
+            room = event_room((data or {}).get("event_id"))
+        except (TypeError, ValueError):
+            return False
+        join_room(room)
+        return True
+
+    @socketio.on("join_events")
+    def join_events():
+        if "user_id" not in session:
+            return False
+        join_room(EVENTS_ROOM)
+        return True
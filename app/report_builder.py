@@ -0,0 +1,197 @@
+import json
+import os
+import sqlite3
+import sys
+
+import xlsxwriter
+
+# --------------------------
+# Semester report workbook (runs in a worker process)
+# --------------------------
+# One ordered query walks the roster by course and name with the semester's
+# attendance joined on, so each student's matrix row is complete as soon as
+# the next student starts and goes straight into a constant_memory sheet.
+# Per-course totals are accumulated on the way and written to the Summary
+# sheet at the end.
+#
+#   python -m app.report_builder <db_path> <semester> <out_path>
+#
+# prints {"done": n, "total": m} progress lines on stdout.
+
+PROGRESS_EVERY = 200
+
+PRESENT, LATE, NO_TIME_OUT, ABSENT = "P", "L", "N", "A"
+STATUS_LABELS = [
+    (PRESENT, "Present (timed in and out)"),
+    (LATE, "Late"),
+    (NO_TIME_OUT, "Timed in, no time out"),
+    (ABSENT, "Absent"),
+]
+# A student with several rows for one event (multi-day events) keeps the best
+RANK = {ABSENT: 0, NO_TIME_OUT: 1, LATE: 2, PRESENT: 3}
+
+MATRIX_QUERY = """
+    SELECT si.usn, si.name, si.course, ea.event_id, ea.time_in, ea.time_out
+    FROM student_info si
+    LEFT JOIN event_attendance ea
+           ON ea.usn = si.usn
+          AND ea.event_id IN (SELECT id FROM events WHERE semester = ?)
+    ORDER BY si.course, si.name, si.usn
+"""
+
+
+def status_code(time_in, time_out):
+    if time_in == "Late":
+        return LATE
+    if not time_in or time_in == "Absent":
+        return ABSENT
+    if not time_out:
+        return NO_TIME_OUT
+    return PRESENT
+
+
+def build(db_path, semester, out_path, progress=None):
+    """Write the semester workbook to out_path and return the number of students."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        # One read transaction so the events, count and matrix agree
+        conn.execute("BEGIN")
+        events = conn.execute(
+            "SELECT id, event_name, event_date FROM events WHERE semester = ? ORDER BY event_date, id",
+            (semester,)
+        ).fetchall()
+        total = conn.execute("SELECT COUNT(*) FROM student_info").fetchone()[0]
+        rows = conn.execute(MATRIX_QUERY, (semester,))
+
+        part_path = out_path + ".part"
+        workbook = xlsxwriter.Workbook(part_path, {
+            "constant_memory": True,
+            "tmpdir": os.path.dirname(os.path.abspath(out_path)),
+        })
+        try:
+            done = _write(workbook, semester, events, total, rows, progress)
+        finally:
+            workbook.close()
+        os.replace(part_path, out_path)
+        return done
+    finally:
+        conn.close()
+
+
+def _write(workbook, semester, events, total, rows, progress):
+    header = workbook.add_format({'bold': True, 'bg_color': '#2E2E2E', 'font_color': 'white', 'border': 1})
+    formats = {
+        LATE: workbook.add_format({'bg_color': '#FFA500', 'font_color': 'black', 'align': 'center'}),
+        ABSENT: workbook.add_format({'bg_color': '#F8B4B4', 'font_color': 'black', 'align': 'center'}),
+        NO_TIME_OUT: workbook.add_format({'bg_color': '#FDE68A', 'font_color': 'black', 'align': 'center'}),
+        PRESENT: workbook.add_format({'align': 'center'}),
+    }
+    percent = workbook.add_format({'num_format': '0.0%'})
+
+    # Summary first in the tab order, filled in once the matrix is done
+    summary = workbook.add_worksheet("Summary")
+    matrix = workbook.add_worksheet("Matrix")
+
+    column = {event[0]: i for i, event in enumerate(events)}
+    first_event_col = 3
+    totals_col = first_event_col + len(events)
+
+    matrix.set_column(0, 0, 14)
+    matrix.set_column(1, 1, 30)
+    matrix.set_column(2, 2, 10)
+    if events:
+        matrix.set_column(first_event_col, totals_col - 1, 12)
+    matrix.freeze_panes(1, first_event_col)
+    matrix.write_row(0, 0, ["USN", "Name", "Course"], header)
+    for i, (_, name, date) in enumerate(events):
+        matrix.write_string(0, first_event_col + i, f"{name} ({date})", header)
+    matrix.write_row(0, totals_col, [code for code, _ in STATUS_LABELS], header)
+
+    courses = {}
+    row_num = 0
+    student = None
+    statuses = None
+
+    def flush():
+        nonlocal row_num
+        if student is None:
+            return
+        row_num += 1
+        usn, name, course = student
+        matrix.write_string(row_num, 0, usn)
+        matrix.write_string(row_num, 1, name or "")
+        matrix.write_string(row_num, 2, course or "")
+        counts = dict.fromkeys(RANK, 0)
+        for i, code in enumerate(statuses):
+            matrix.write_string(row_num, first_event_col + i, code, formats[code])
+            counts[code] += 1
+        matrix.write_row(row_num, totals_col, [counts[code] for code, _ in STATUS_LABELS])
+
+        totals = courses.setdefault(course, dict.fromkeys(RANK, 0) | {"students": 0})
+        totals["students"] += 1
+        for code, n in counts.items():
+            totals[code] += n
+
+        if progress is not None and row_num % PROGRESS_EVERY == 0:
+            progress(row_num, total)
+
+    for usn, name, course, event_id, time_in, time_out in rows:
+        if student is None or usn != student[0]:
+            flush()
+            student = (usn, name, course)
+            statuses = [ABSENT] * len(events)
+        if event_id is not None:
+            i = column[event_id]
+            code = status_code(time_in, time_out)
+            if RANK[code] > RANK[statuses[i]]:
+                statuses[i] = code
+    flush()
+
+    _write_summary(summary, header, percent, semester, len(events), courses)
+    if progress is not None:
+        progress(row_num, total)
+    return row_num
+
+
+def _write_summary(sheet, header, percent, semester, event_count, courses):
+    columns = ["Course", "Students", "Present", "Late", "No Time Out", "Absent", "Attendance Rate"]
+    sheet.set_column(0, len(columns) - 1, 16)
+    sheet.write_string(0, 0, f"Semester: {semester}")
+    sheet.write_string(1, 0, f"Events: {event_count}")
+    sheet.write_row(3, 0, columns, header)
+
+    row_num = 3
+    overall = dict.fromkeys(RANK, 0) | {"students": 0}
+    for course in sorted(courses, key=lambda c: c or ""):
+        totals = courses[course]
+        row_num += 1
+        _summary_row(sheet, row_num, course or "", totals, event_count, percent)
+        for key, n in totals.items():
+            overall[key] += n
+    row_num += 1
+    _summary_row(sheet, row_num, "All", overall, event_count, percent)
+
+    row_num += 2
+    sheet.write_string(row_num, 0, "Code", header)
+    sheet.write_string(row_num, 1, "Meaning", header)
+    for code, label in STATUS_LABELS:
+        row_num += 1
+        sheet.write_row(row_num, 0, [code, label])
+
+
+def _summary_row(sheet, row_num, label, totals, event_count, percent):
+    slots = totals["students"] * event_count
+    attended = totals[PRESENT] + totals[LATE] + totals[NO_TIME_OUT]
+    sheet.write_row(row_num, 0, [
+        label, totals["students"], totals[PRESENT], totals[LATE], totals[NO_TIME_OUT], totals[ABSENT],
+    ])
+    sheet.write_number(row_num, 6, attended / slots if slots else 0, percent)
+
+
+def _print_progress(done, total):
+    print(json.dumps({"done": done, "total": total}), flush=True)
+
+
+if __name__ == "__main__":
+    db_path, semester, out_path = sys.argv[1:4]
+    build(db_path, semester, out_path, progress=_print_progress)
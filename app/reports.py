@@ -0,0 +1,147 @@
+import glob
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+
+from app.models import DB_PATH
+
+# --------------------------
+# Background semester report jobs
+# --------------------------
+# Each report is built by app.report_builder in its own worker process, at
+# most MAX_WORKERS at a time, so the matrix query and workbook writing never
+# run on the eventlet hub. The finished file lives in REPORT_DIR named after
+# the semester and its semester_versions counter; asking again before the
+# data changes hands back the cached workbook without building anything.
+
+REPORT_DIR = os.environ.get("OSAS_REPORT_DIR", "reports")
+MAX_WORKERS = int(os.environ.get("OSAS_REPORT_WORKERS", "2"))
+MAX_JOBS = 100  # finished jobs remembered for polling
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+def semester_version(cur, semester):
+    cur.execute("SELECT version FROM semester_versions WHERE semester=?", (semester,))
+    row = cur.fetchone()
+    return row["version"] if row else 0
+
+
+def report_path(semester, version):
+    safe = re.sub(r"[^A-Za-z0-9_-]", "_", semester)
+    return os.path.abspath(os.path.join(REPORT_DIR, f"semester_{safe}_v{version}.xlsx"))
+
+
+class ReportJob:
+    def __init__(self, semester, version):
+        self.id = uuid.uuid4().hex[:12]
+        self.semester = semester
+        self.version = version
+        self.path = report_path(semester, version)
+        self.status = QUEUED
+        self.cached = False
+        self.done = 0
+        self.total = 0
+        self.error = None
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "semester": self.semester,
+            "version": self.version,
+            "status": self.status,
+            "cached": self.cached,
+            "done": self.done,
+            "total": self.total,
+            "error": self.error,
+            "download_url": f"/reports/{self.id}/download" if self.status == DONE else None,
+        }
+
+
+class ReportJobs:
+    def __init__(self, max_workers=MAX_WORKERS):
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_workers)
+
+    def start(self, cur, semester, on_update=None):
+        """Return the job for semester's current data, starting a build if there is none."""
+        version = semester_version(cur, semester)
+        with self._lock:
+            for job in reversed(self._jobs.values()):
+                if job.semester == semester and job.version == version and job.status != FAILED:
+                    if job.status != DONE or os.path.exists(job.path):
+                        return job
+
+            job = ReportJob(semester, version)
+            self._remember(job)
+            if os.path.exists(job.path):
+                job.status = DONE
+                job.cached = True
+                return job
+
+        threading.Thread(target=self._run, args=(job, on_update), name=f"report-{job.id}", daemon=True).start()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _remember(self, job):
+        self._jobs[job.id] = job
+        while len(self._jobs) > MAX_JOBS:
+            self._jobs.popitem(last=False)
+
+    def _run(self, job, on_update):
+        notify = on_update or (lambda job: None)
+        notify(job)
+        with self._slots:
+            job.status = RUNNING
+            notify(job)
+            os.makedirs(os.path.dirname(job.path), exist_ok=True)
+            output = []
+            try:
+                proc = subprocess.Popen(
+                    [sys.executable, "-m", "app.report_builder", os.path.abspath(DB_PATH), job.semester, job.path],
+                    cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                )
+                for line in proc.stdout:
+                    try:
+                        progress = json.loads(line)
+                    except ValueError:
+                        output.append(line)
+                        continue
+                    job.done, job.total = progress["done"], progress["total"]
+                    notify(job)
+                returncode = proc.wait()
+            except OSError as e:
+                output.append(str(e))
+                returncode = -1
+
+        if returncode == 0:
+            job.status = DONE
+            self._prune(job)
+        else:
+            job.status = FAILED
+            job.error = (output[-1].strip() if output else f"worker exited with {returncode}")
+        notify(job)
+
+    def _prune(self, job):
+        # Older versions of this semester's report can't be asked for again
+        for path in glob.glob(report_path(job.semester, "*")):
+            version = path[:-len(".xlsx")].rsplit("_v", 1)[-1]
+            if version.isdigit() and int(version) < job.version:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+report_jobs = ReportJobs()
@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import OrderedDict
+
+# --------------------------
+# In-process student roster cache
+# --------------------------
+# Barcode scans only need a student's name and course, and the roster hardly
+# changes during an event. Known USNs are kept in a bounded LRU; unknown ones
+# go into a negative cache so repeated scans of unregistered IDs never reach
+# SQLite. Student CRUD calls invalidate() for the USN it touched.
+
+MAX_ENTRIES = 50000
+MAX_NEGATIVE_ENTRIES = 5000
+# Students added outside this process (e.g. the insert_to_db.py script)
+# become scannable once their negative entry expires.
+NEGATIVE_TTL = 30.0
+# Same idea for the cached roster size used by the dashboard and /event
+COUNT_TTL = 30.0
+
+
+class RosterCache:
+    def __init__(self, max_entries=MAX_ENTRIES, max_negative=MAX_NEGATIVE_ENTRIES, negative_ttl=NEGATIVE_TTL):
+        self.max_entries = max_entries
+        self.max_negative = max_negative
+        self.negative_ttl = negative_ttl
+        self._students = OrderedDict()
+        self._unknown = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self._generation = 0
+        self._count = None
+        self._count_expires = 0.0
+
+    def get(self, cur, usn):
+        """Return {"usn", "name", "course"} for usn, or None if not registered (or retired)."""
+        with self._lock:
+            student = self._students.get(usn)
+            if student is not None:
+                self._students.move_to_end(usn)
+                self.hits += 1
+                return student
+            expires = self._unknown.get(usn)
+            if expires is not None:
+                if expires > time.monotonic():
+                    self.negative_hits += 1
+                    return None
+                del self._unknown[usn]
+            self.misses += 1
+            generation = self._generation
+
+        cur.execute("SELECT usn, name, course FROM student_info WHERE usn=? AND retired_at IS NULL", (usn,))
+        row = cur.fetchone()
+
+        with self._lock:
+            # Don't cache a row that a concurrent invalidate() already made stale
+            cache = generation == self._generation
+            if row is None:
+                if not cache:
+                    return None
+                self._unknown[usn] = time.monotonic() + self.negative_ttl
+                if len(self._unknown) > self.max_negative:
+                    self._unknown.popitem(last=False)
+                return None
+            student = {"usn": row["usn"], "name": row["name"], "course": row["course"]}
+            if not cache:
+                return student
+            self._students[usn] = student
+            if len(self._students) > self.max_entries:
+                self._students.popitem(last=False)
+            return student
+
+    def count(self, cur):
+        """Number of active students, cached until the next student CRUD."""
+        with self._lock:
+            if self._count is not None and self._count_expires > time.monotonic():
+                return self._count
+            generation = self._generation
+
+        cur.execute("SELECT COUNT(*) FROM student_info WHERE retired_at IS NULL")
+        count = cur.fetchone()[0]
+
+        with self._lock:
+            if generation == self._generation:
+                self._count = count
+                self._count_expires = time.monotonic() + COUNT_TTL
+        return count
+
+    def invalidate(self, *usns):
+        with self._lock:
+            self._generation += 1
+            self._count = None
+            for usn in usns:
+                self._students.pop(usn, None)
+                self._unknown.pop(usn, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._count = None
+            self._students.clear()
+            self._unknown.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._students),
+                "negative_entries": len(self._unknown),
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+            }
+
+
+roster_cache = RosterCache()
@@ -0,0 +1,192 @@
+import hashlib
+import importlib.util
+
+import pandas as pd
+
+# --------------------------
+# Bulk roster import from the registrar's workbook
+# --------------------------
+# Every sheet is one course (the sheet name) with USN / name columns. The
+# workbook is opened once and each sheet parsed once as text; headers and
+# names are normalized with column operations instead of per-row Python,
+# and the rows go in with a single executemany per sheet.
+
+# Map actual column names to expected ones
+COLUMN_MAPPING = {
+    'USN/TEMPORARY': 'USN',
+    'USN': 'USN',  # keep if some sheets already have correct 'USN'
+    'LAST NAME': 'LAST NAME',
+    'FIRST NAME': 'FIRST NAME',
+    'MIDDLE NAME': 'MIDDLE NAME'
+}
+REQUIRED_COLUMNS = ['USN', 'LAST NAME', 'FIRST NAME']
+DEFAULT_CONTACT = "N/A"
+
+# python-calamine (Rust) parses xlsx roughly ten times faster than openpyxl;
+# use it when installed and fall back to pandas' default engine otherwise.
+EXCEL_ENGINE = "calamine" if importlib.util.find_spec("python_calamine") else None
+
+INSERT_STUDENTS = """
+    INSERT INTO student_info (usn, name, course, contact, roster_hash)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (usn) DO NOTHING
+"""
+
+
+def roster_hash(usn, name, course):
+    """Fingerprint of the roster fields a sync compares (contact is edited in the app)."""
+    return hashlib.blake2b(f"{usn}\x1f{name}\x1f{course}".encode(), digest_size=8).hexdigest()
+
+
+def normalize_columns(columns):
+    cols = pd.Index(columns).astype(str).str.strip().str.replace('\xa0', '', regex=False).str.upper()
+    return cols.map(lambda col: COLUMN_MAPPING.get(col, col))
+
+
+def _text(df, column):
+    if column not in df.columns:
+        return pd.Series("", index=df.index)
+    return df[column].fillna("").astype(str).str.strip()
+
+
+def normalize_sheet(df, sheet_name):
+    """
+    Turn one raw sheet into (usn, name, course, contact) rows.
+    Returns (rows DataFrame, blank row count, errors).
+    """
+    df.columns = normalize_columns(df.columns)
+    # Two source headers can map to the same name; keep the first
+    df = df.loc[:, ~df.columns.duplicated()]
+
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        return None, 0, [f"Missing column(s): {', '.join(missing)}"]
+
+    usn = _text(df, 'USN')
+    name = (_text(df, 'LAST NAME') + " " + _text(df, 'FIRST NAME') + " " + _text(df, 'MIDDLE NAME'))
+    name = name.str.replace(r"\s+", " ", regex=True).str.strip()
+
+    rows = pd.DataFrame({
+        "usn": usn,
+        "name": name,
+        "course": str(sheet_name).strip(),
+        "contact": DEFAULT_CONTACT,
+    })
+    blank = usn == ""
+    rows = rows[~blank]
+
+    errors = []
+    nameless = rows["name"] == ""
+    if nameless.any():
+        errors.append(f"{int(nameless.sum())} row(s) without a name skipped (e.g. USN {rows.loc[nameless, 'usn'].iloc[0]})")
+        rows = rows[~nameless]
+
+    dupes = rows["usn"].duplicated()
+    if dupes.any():
+        errors.append(f"{int(dupes.sum())} duplicate USN(s) in sheet (e.g. {rows.loc[dupes, 'usn'].iloc[0]})")
+        rows = rows[~dupes]
+
+    rows = rows.assign(roster_hash=[roster_hash(*row) for row in zip(rows["usn"], rows["name"], rows["course"])])
+    return rows, int(blank.sum()), errors
+
+
+def read_sheets(source):
+    """Open the workbook once and yield (sheet name, parse function) per sheet."""
+    xls = pd.ExcelFile(source, engine=EXCEL_ENGINE)
+    for sheet_name in xls.sheet_names:
+        yield sheet_name, (lambda sheet_name=sheet_name: xls.parse(sheet_name, dtype=str))
+
+
+def insert_rows(cur, rows):
+    """Insert new students, leaving existing USNs alone. Returns the number inserted."""
+    cur.executemany(INSERT_STUDENTS, rows.itertuples(index=False, name=None))
+    return cur.rowcount
+
+
+# --------------------------
+# Incremental sync against the stored roster
+# --------------------------
+# student_info.roster_hash remembers each row as it was last imported, so a
+# re-run only writes students whose roster entry changed since, and manual
+# edits made in the app survive until the registrar's copy changes. Rows
+# imported before hashes existed are compared on their current values.
+
+SAMPLE_SIZE = 20
+
+
+class RosterDiff:
+    def __init__(self):
+        self.inserts = []      # (usn, name, course, contact, roster_hash)
+        self.updates = []      # (usn, before, after)
+        self.retirements = []  # (usn, name, course)
+        self.rehash = []       # (roster_hash, usn) unchanged rows missing a hash
+        self.unchanged = 0
+
+    def summary(self):
+        return {
+            "inserts": len(self.inserts),
+            "updates": len(self.updates),
+            "retirements": len(self.retirements),
+            "unchanged": self.unchanged,
+            "samples": {
+                "inserts": [{"usn": r[0], "name": r[1], "course": r[2]} for r in self.inserts[:SAMPLE_SIZE]],
+                "updates": [{"usn": usn, "before": before, "after": after} for usn, before, after in self.updates[:SAMPLE_SIZE]],
+                "retirements": [{"usn": r[0], "name": r[1], "course": r[2]} for r in self.retirements[:SAMPLE_SIZE]],
+            },
+        }
+
+
+def combine_sheets(frames):
+    """Concatenate parsed sheets; a USN listed in two sheets keeps its first."""
+    if not frames:
+        return pd.DataFrame(columns=["usn", "name", "course", "contact", "roster_hash"]), []
+    rows = pd.concat(frames, ignore_index=True)
+    dupes = rows["usn"].duplicated()
+    errors = []
+    if dupes.any():
+        errors.append(f"{int(dupes.sum())} USN(s) appear in more than one sheet (e.g. {rows.loc[dupes, 'usn'].iloc[0]}); the first sheet wins")
+        rows = rows[~dupes]
+    return rows, errors
+
+
+def diff_roster(cur, rows, retire=False):
+    cur.execute("SELECT usn, name, course, roster_hash, retired_at FROM student_info")
+    stored = {row["usn"]: row for row in cur.fetchall()}
+
+    diff = RosterDiff()
+    for usn, name, course, contact, new_hash in rows.itertuples(index=False, name=None):
+        current = stored.pop(usn, None)
+        if current is None:
+            diff.inserts.append((usn, name, course, contact, new_hash))
+            continue
+        old_hash = current["roster_hash"] or roster_hash(usn, current["name"], current["course"])
+        if old_hash != new_hash or current["retired_at"]:
+            diff.updates.append((
+                usn,
+                {"name": current["name"], "course": current["course"], "retired": bool(current["retired_at"])},
+                {"name": name, "course": course, "hash": new_hash},
+            ))
+        else:
+            diff.unchanged += 1
+            if current["roster_hash"] is None:
+                diff.rehash.append((new_hash, usn))
+
+    if retire:
+        diff.retirements = [
+            (usn, row["name"], row["course"]) for usn, row in stored.items() if not row["retired_at"]
+        ]
+    return diff
+
+
+def apply_diff(cur, diff, retired_at):
+    """Write the diff; the caller owns the transaction."""
+    cur.executemany(INSERT_STUDENTS, diff.inserts)
+    cur.executemany(
+        "UPDATE student_info SET name=?, course=?, roster_hash=?, retired_at=NULL WHERE usn=?",
+        [(after["name"], after["course"], after["hash"], usn) for usn, _, after in diff.updates]
+    )
+    cur.executemany(
+        "UPDATE student_info SET retired_at=? WHERE usn=?",
+        [(retired_at, usn) for usn, _, _ in diff.retirements]
+    )
+    cur.executemany("UPDATE student_info SET roster_hash=? WHERE usn=?", diff.rehash)
@@ -1,17 +1,11 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from werkzeug.security import generate_password_hash, check_password_hash
-import sqlite3
 from functools import wraps
+from app.models import get_db_connection
+from app.offload import run_blocking
 
 bp = Blueprint("auth", __name__, template_folder="../templates")
 
-DB_PATH = "osas_attendance.db"
-
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
 # ---------------------------
 # Decorator to require login
 # ---------------------------
@@ -50,7 +44,8 @@ def login():
         user = cur.fetchone()
         conn.close()
 
-        if user and check_password_hash(user["password"], password):
+        # Hashing is CPU-bound; keep it off the eventlet hub
+        if user and run_blocking(check_password_hash, user["password"], password):
             # Reset attempts after success
             session["failed_attempts"] = 0
 
@@ -140,7 +135,7 @@ def create_account():
             return redirect(url_for("auth.create_account"))
 
         # All good → create account
-        hashed_pw = generate_password_hash(password)
+        hashed_pw = run_blocking(generate_password_hash, password)
         cur.execute(
             "INSERT INTO user_accounts (username, password, user_type) VALUES (?, ?, ?)",
             (username, hashed_pw, user_type),
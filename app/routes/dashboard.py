@@ -1,13 +1,10 @@
-from flask import Blueprint, render_template, session, redirect, url_for
-import sqlite3
+from flask import Blueprint, render_template, session, redirect, url_for, jsonify
+from app.models import get_db_connection
+from app.roster import roster_cache
+from app.writer import scan_writer
+from app.realtime import broadcaster
 
 bp = Blueprint("dashboard", __name__, template_folder="../templates")
-DB_PATH = "osas_attendance.db"
-
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # Enables dict-like access
-    return conn
 
 @bp.route("/dashboard")
 def dashboard():
@@ -25,33 +22,28 @@ def dashboard():
     cur = conn.cursor()
 
     # ---------------------------
-    # Fetch events and students
+    # Fetch events with their rollup counts (one grouped read)
     # ---------------------------
-    cur.execute("SELECT id, event_name, event_date FROM events ORDER BY event_date ASC")
+    cur.execute("""
+        SELECT e.id, e.event_name, e.event_date,
+               IFNULL(s.present, 0) AS present,
+               IFNULL(s.late, 0) AS late
+        FROM events e
+        LEFT JOIN event_stats s ON s.event_id = e.id
+        ORDER BY e.event_date ASC
+    """)
     events_raw = cur.fetchall()
     total_events = len(events_raw)
 
-    cur.execute("SELECT usn, name FROM student_info ORDER BY name ASC")
-    students_raw = cur.fetchall()
-    total_students = len(students_raw)
-
-    event_ids = [e["id"] for e in events_raw]
+    total_students = roster_cache.count(cur)
 
     # ---------------------------
     # Compute global statistics
     # ---------------------------
     total_present = total_late = total_absent = 0
-    if event_ids and total_students > 0:
-        cur.execute(f"""
-            SELECT 
-                SUM(CASE WHEN time_in IS NOT NULL AND time_in != '' AND time_in != 'Absent' AND time_in != 'Late' THEN 1 ELSE 0 END) AS total_present,
-                SUM(CASE WHEN time_in = 'Late' THEN 1 ELSE 0 END) AS total_late
-            FROM event_attendance
-            WHERE event_id IN ({','.join(['?']*len(event_ids))})
-        """, event_ids)
-        stats = cur.fetchone()
-        total_present = stats["total_present"] or 0
-        total_late = stats["total_late"] or 0
+    if events_raw and total_students > 0:
+        total_present = sum(e["present"] for e in events_raw)
+        total_late = sum(e["late"] for e in events_raw)
         total_records = total_students * total_events
         total_absent = total_records - (total_present + total_late)
     else:
@@ -62,30 +54,18 @@ def dashboard():
     absent_percentage = f"{(total_absent/total_records*100):.1f}%" if total_records else "0%"
 
     # ---------------------------
-    # Compute per-event statistics
+    # Per-event statistics
     # ---------------------------
     events = []
     for e in events_raw:
-        cur.execute("""
-            SELECT 
-                SUM(CASE WHEN time_in IS NOT NULL AND time_in != '' AND time_in != 'Absent' AND time_in != 'Late' THEN 1 ELSE 0 END) AS present,
-                SUM(CASE WHEN time_in = 'Late' THEN 1 ELSE 0 END) AS late
-            FROM event_attendance
-            WHERE event_id = ?
-        """, (e["id"],))
-        event_stats = cur.fetchone()
-        present = event_stats["present"] or 0
-        late = event_stats["late"] or 0
-        absent = total_students - (present + late)
-
         events.append({
             "id": e["id"],
             "event_name": e["event_name"],
             "event_date": e["event_date"],
             "total_students": total_students,
-            "present": present,
-            "late": late,
-            "absent": absent
+            "present": e["present"],
+            "late": e["late"],
+            "absent": total_students - (e["present"] + e["late"])
         })
 
     conn.close()
@@ -104,3 +84,17 @@ def dashboard():
         total_students=total_students,
         total_events=total_events
     )
+
+# ---------------------------
+# Runtime metrics (JSON)
+# ---------------------------
+@bp.route("/metrics")
+def metrics():
+    if "user_id" not in session:
+        return redirect(url_for("auth.login"))
+
+    return jsonify({
+        "roster_cache": roster_cache.stats(),
+        "scan_writer": scan_writer.stats(),
+        "broadcaster": broadcaster.stats()
+    })
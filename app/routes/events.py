@@ -1,14 +1,18 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session, Response, stream_with_context
 from flask_socketio import SocketIO
-import sqlite3
-from datetime import datetime
-import pandas as pd
-import io
+import os
+from app.models import get_db_connection
+from app.offload import run_blocking
+from app.export import ExportScope, XLSX_MIMETYPE, open_export, write_xlsx, xlsx_tempfile, file_chunks, csv_chunks
+from app.attendance import record_scan, submit_scan
+from app.writer import QueueFull, RETRY_AFTER
+from app.active_event import active_events
+from app.roster import roster_cache
+from app.realtime import broadcaster, event_room, EVENTS_ROOM
+from app.cluster import invalidate_event
 
 bp = Blueprint("event", __name__, template_folder="../templates")
 
-DB_PATH = "osas_attendance.db"
-
 # --------------------------
 # SocketIO instance
 # --------------------------
@@ -18,14 +22,6 @@ def set_socketio(sio: SocketIO):
     global socketio
     socketio = sio
 
-# --------------------------
-# Helper function
-# --------------------------
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
 # --------------------------
 # SESSION CHECK DECORATOR
 # --------------------------
@@ -42,44 +38,87 @@ def login_required(func):
 # --------------------------
 # Read Events
 # --------------------------
+EVENTS_PAGE_SIZE = 20
+
+EVENT_LIST_QUERY = """
+    SELECT e.*,
+           IFNULL(s.present, 0) AS attended,
+           IFNULL(s.late, 0) AS late,
+           IFNULL(s.no_time_out, 0) AS no_time_out,
+           IFNULL(s.records, 0) AS records
+    FROM events e
+    LEFT JOIN event_stats s ON s.event_id = e.id
+"""
+
+def event_with_stats(row, total_students):
+    event = dict(row)
+    event["stats"] = {
+        "attended": event.pop("attended"),
+        "late": event.pop("late"),
+        "no_time_out": event.pop("no_time_out"),
+        "absent": total_students - event.pop("records")
+    }
+    return event
+
 @bp.route("/event")
 @login_required
 def event():
+    # Keyset pagination on (event_date, id), newest first
+    before = request.args.get("before")
+    before_id = request.args.get("before_id", type=int)
+    after = request.args.get("after")
+    after_id = request.args.get("after_id", type=int)
+    limit = EVENTS_PAGE_SIZE + 1
+
     conn = get_db_connection()
     cur = conn.cursor()
-    cur.execute("SELECT * FROM events ORDER BY event_date DESC")
-    rows = cur.fetchall()
-
-    events = []
-    for row in rows:
-        event = dict(row)
-
-        # Calculate attendance stats for this event
-        cur.execute("""
-            SELECT
-                SUM(CASE WHEN time_in NOT NULL AND time_in != 'Late' THEN 1 ELSE 0 END) AS attended,
-                SUM(CASE WHEN time_in = 'Late' THEN 1 ELSE 0 END) AS late,
-                SUM(CASE WHEN time_in NOT NULL AND (time_out IS NULL OR time_out = '') THEN 1 ELSE 0 END) AS no_time_out,
-                (SELECT COUNT(*) FROM student_info) - COUNT(*) AS absent
-            FROM event_attendance
-            WHERE event_id = ?
-        """, (event['id'],))
-        stats_row = cur.fetchone()
-        if stats_row:
-            stats = {
-                "attended": stats_row["attended"] or 0,
-                "late": stats_row["late"] or 0,
-                "no_time_out": stats_row["no_time_out"] or 0,
-                "absent": stats_row["absent"] or 0
-            }
-        else:
-            stats = {"attended":0,"late":0,"no_time_out":0,"absent":0}
-
-        event["stats"] = stats
-        events.append(event)
-
+    total_students = roster_cache.count(cur)
+
+    # Stats for the visible page only, from the event_stats rollup
+    if after is not None and after_id is not None:
+        cur.execute(EVENT_LIST_QUERY + """
+            WHERE (e.event_date, e.id) > (?, ?)
+            ORDER BY e.event_date ASC, e.id ASC LIMIT ?
+        """, (after, after_id, limit))
+        rows = cur.fetchall()
+        has_newer = len(rows) > EVENTS_PAGE_SIZE
+        rows = rows[:EVENTS_PAGE_SIZE][::-1]
+        has_older = True
+    elif before is not None and before_id is not None:
+        cur.execute(EVENT_LIST_QUERY + """
+            WHERE (e.event_date, e.id) < (?, ?)
+            ORDER BY e.event_date DESC, e.id DESC LIMIT ?
+        """, (before, before_id, limit))
+        rows = cur.fetchall()
+        has_older = len(rows) > EVENTS_PAGE_SIZE
+        rows = rows[:EVENTS_PAGE_SIZE]
+        has_newer = True
+    else:
+        cur.execute(EVENT_LIST_QUERY + """
+            ORDER BY e.event_date DESC, e.id DESC LIMIT ?
+        """, (limit,))
+        rows = cur.fetchall()
+        has_older = len(rows) > EVENTS_PAGE_SIZE
+        rows = rows[:EVENTS_PAGE_SIZE]
+        has_newer = False
+
+    events = [event_with_stats(row, total_students) for row in rows]
     conn.close()
-    return render_template("events.html", events=events, user_name=session.get("username", "Officer"))
+
+    newer_cursor = older_cursor = None
+    if events and has_newer:
+        newer_cursor = {"after": events[0]["event_date"], "after_id": events[0]["id"]}
+    if events and has_older:
+        older_cursor = {"before": events[-1]["event_date"], "before_id": events[-1]["id"]}
+
+    return render_template(
+        "events.html",
+        events=events,
+        newer_cursor=newer_cursor,
+        older_cursor=older_cursor,
+        page_size=EVENTS_PAGE_SIZE,
+        user_name=session.get("username", "Officer")
+    )
 
 
 # --------------------------
@@ -105,6 +144,7 @@ def add_event():
     )
     conn.commit()
     new_id = cur.lastrowid
+    total_students = roster_cache.count(cur)
     conn.close()
 
     event_data = {
@@ -112,12 +152,13 @@ def add_event():
         "event_name": event_name,
         "event_date": event_date,
         "semester": semester,
-        "cutoff_time": cutoff_time
+        "cutoff_time": cutoff_time,
+        "stats": {"attended": 0, "late": 0, "no_time_out": 0, "absent": total_students}
     }
 
     # Emit to all clients
     if socketio:
-        socketio.emit("event_added", event_data)
+        socketio.emit("event_added", event_data, to=EVENTS_ROOM)
 
     flash("Event created successfully!", "success")
     return redirect(url_for("event.event"))
@@ -144,18 +185,19 @@ def update_event(event_id):
         (event_name, event_date, semester, cutoff_time, event_id)
     )
     conn.commit()
+    cur.execute(EVENT_LIST_QUERY + " WHERE e.id = ?", (event_id,))
+    row = cur.fetchone()
+    total_students = roster_cache.count(cur)
     conn.close()
+    invalidate_event(event_id)
 
-    event_data = {
-        "id": event_id,
-        "event_name": event_name,
-        "event_date": event_date,
-        "semester": semester,
-        "cutoff_time": cutoff_time
-    }
+    if not row:
+        flash("Event not found.", "error")
+        return redirect(url_for("event.event"))
+    event_data = event_with_stats(row, total_students)
 
     if socketio:
-        socketio.emit("event_updated", event_data)
+        socketio.emit("event_updated", event_data, to=EVENTS_ROOM)
 
     flash("Event updated successfully!", "success")
     return redirect(url_for("event.event"))
@@ -178,9 +220,10 @@ def delete_event(event_id):
     cur.execute("DELETE FROM events WHERE id=?", (event_id,))
     conn.commit()
     conn.close()
+    invalidate_event(event_id)
 
     if socketio:
-        socketio.emit("event_deleted", {"id": event_id})
+        socketio.emit("event_deleted", {"id": event_id}, to=EVENTS_ROOM)
 
     flash("Event deleted successfully!", "success")
     return redirect(url_for("event.event"))
@@ -203,6 +246,9 @@ def view_attendance(event_id):
 
     event = dict(event)
 
+    # Warm the in-memory scan state for this event
+    active_events.warm(cur, event_id)
+
     cur.execute("""
         SELECT ea.*, si.name
         FROM event_attendance ea
@@ -224,6 +270,11 @@ def view_attendance(event_id):
 # --------------------------
 # Scan Attendance (Real-time)
 # --------------------------
+def writer_busy():
+    response = jsonify({"error": "Scanner queue is busy. Please retry."})
+    response.headers["Retry-After"] = str(RETRY_AFTER)
+    return response, 503
+
 @bp.route("/scan_attendance", methods=["POST"])
 @login_required
 def scan_attendance():
@@ -236,192 +287,129 @@ def scan_attendance():
     action = data["action"].strip()
     event_id = data["event_id"]
 
-    conn = get_db_connection()
-    cur = conn.cursor()
+    # Writes go through the group-commit writer instead of a per-request commit
+    try:
+        body, status = submit_scan(lambda cur: record_scan(cur, event_id, barcode, action), [event_id])
+    except QueueFull:
+        return writer_busy()
 
-    # Validate student
-    cur.execute("SELECT usn, name FROM student_info WHERE usn=?", (barcode,))
-    student = cur.fetchone()
-    if not student:
-        conn.close()
-        return jsonify({"error": "Student not found"}), 404
+    if status == 200:
+        broadcaster.publish("attendance_updates", event_room(event_id), {"event_id": int(event_id), **body["record"]})
 
-    # Get event details
-    cur.execute("SELECT event_date, cutoff_time FROM events WHERE id=?", (event_id,))
-    event = cur.fetchone()
-    if not event:
-        conn.close()
-        return jsonify({"error": "Event not found"}), 404
+    return jsonify(body), status
 
-    today = datetime.now().strftime("%Y-%m-%d")
-    now = datetime.now()
-    current_time_str = now.strftime("%H:%M")  # store as 24-hour for consistency
+# --------------------------
+# Scan Attendance (Batch)
+# --------------------------
+MAX_BATCH_SIZE = 500
 
-    cutoff_time_str = event["cutoff_time"]
-    after_cutoff = False
-    if cutoff_time_str:
-        cutoff_dt = datetime.strptime(cutoff_time_str, "%H:%M")  # parse 24-hour
-        cutoff_dt = now.replace(hour=cutoff_dt.hour, minute=cutoff_dt.minute, second=0, microsecond=0)
-        if now > cutoff_dt:
-            after_cutoff = True
+@bp.route("/scan_attendance/batch", methods=["POST"])
+@login_required
+def scan_attendance_batch():
+    data = request.get_json()
+    if not data or not isinstance(data.get("items"), list) or not data["items"]:
+        return jsonify({"error": "Missing required fields"}), 400
+    items = data["items"]
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch too large (max {MAX_BATCH_SIZE} items)"}), 413
+
+    items = [item if isinstance(item, dict) else {} for item in items]
+    event_ids = {item.get("event_id", data.get("event_id")) for item in items}
+
+    def apply_batch(cur):
+        results = [None] * len(items)
+        # Apply in scan order so a time-in and its time-out in the same burst land correctly
+        order = sorted(range(len(items)), key=lambda i: str(items[i].get("client_ts") or ""))
+        for i in order:
+            item = items[i]
+            event_id = item.get("event_id", data.get("event_id"))
+            if not item.get("barcode") or not item.get("action") or event_id is None:
+                body, status = {"error": "Missing required fields"}, 400
+            else:
+                body, status = record_scan(cur, event_id, str(item["barcode"]).strip(), str(item["action"]).strip())
+            results[i] = {"client_ts": item.get("client_ts"), "status": status, "event_id": event_id, **body}
+        return results
+
+    # The whole batch is one job, so it commits atomically with its group
+    try:
+        results = submit_scan(apply_batch, event_ids)
+    except QueueFull:
+        return writer_busy()
+
+    for r in results:
+        if r["status"] == 200:
+            broadcaster.publish("attendance_updates", event_room(r["event_id"]), {"event_id": int(r["event_id"]), **r["record"]})
+
+    return jsonify({"results": results}), 200
 
-    # Check existing record
-    cur.execute(
-        "SELECT * FROM event_attendance WHERE usn=? AND event_id=? AND date=?",
-        (barcode, event_id, today)
+# --------------------------
+# Export Attendance to Excel / CSV
+# --------------------------
+# /export_excel/<id> and /export_csv/<id> export one event. Without an id
+# they export a range: ?start=YYYY-MM-DD&end=YYYY-MM-DD and/or ?semester=1st.
+def export_scope(event_id):
+    if event_id is not None:
+        return ExportScope(event_id=event_id)
+    return ExportScope(
+        start=request.args.get("start", "").strip(),
+        end=request.args.get("end", "").strip(),
+        semester=request.args.get("semester", "").strip(),
     )
-    record = cur.fetchone()
-
-    if action == "time_in":
-        if after_cutoff:
-            conn.close()
-            return jsonify({"error": "⚠ Attendance cutoff time reached. Cannot time in."}), 400
-        if record:
-            conn.close()
-            return jsonify({"error": "Already timed in today"}), 400
-
-        time_in_value = current_time_str
-        cur.execute(
-            "INSERT INTO event_attendance (event_id, usn, date, time_in) VALUES (?, ?, ?, ?)",
-            (event_id, barcode, today, time_in_value)
-        )
-        conn.commit()
-        conn.close()
 
-        if socketio:
-            socketio.emit("attendance_update", {
-                "event_id": event_id,
-                "usn": student["usn"],
-                "name": student["name"],
-                "date": today,
-                "time_in": time_in_value,
-                "time_out": ""
-            }, include_self=True)
-
-        return jsonify({
-            "record": {
-                "usn": student["usn"],
-                "name": student["name"],
-                "date": today,
-                "time_in": time_in_value,
-                "time_out": ""
-            }
-        }), 200
-
-    elif action == "time_out":
-        if not record:
-            time_in_value = "Late"
-            time_out_value = current_time_str
-            cur.execute(
-                "INSERT INTO event_attendance (event_id, usn, date, time_in, time_out) VALUES (?, ?, ?, ?, ?)",
-                (event_id, barcode, today, time_in_value, time_out_value)
-            )
-            conn.commit()
-            conn.close()
-
-            if socketio:
-                socketio.emit("attendance_update", {
-                    "event_id": event_id,
-                    "usn": student["usn"],
-                    "name": student["name"],
-                    "date": today,
-                    "time_in": time_in_value,
-                    "time_out": time_out_value
-                }, include_self=True)
-
-            return jsonify({
-                "record": {
-                    "usn": student["usn"],
-                    "name": student["name"],
-                    "date": today,
-                    "time_in": time_in_value,
-                    "time_out": time_out_value
-                }
-            }), 200
-
-        cur.execute(
-            "UPDATE event_attendance SET time_out=? WHERE usn=? AND event_id=? AND date=?",
-            (current_time_str, barcode, event_id, today)
-        )
-        conn.commit()
+
+@bp.route("/export_excel")
+@bp.route("/export_excel/<int:event_id>")
+@login_required
+def export_excel(event_id=None):
+    scope = export_scope(event_id)
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        first, rows = open_export(cur, scope)
+        if first is None:
+            flash("⚠ No attendance records to export.", "warning")
+            return redirect(url_for("event.event"))
+
+        path, cleanup = xlsx_tempfile(scope)
+        try:
+            run_blocking(write_xlsx, path, scope.columns, first, rows)
+        except Exception:
+            cleanup()
+            raise
+    finally:
         conn.close()
 
-        if socketio:
-            socketio.emit("attendance_update", {
-                "event_id": event_id,
-                "usn": student["usn"],
-                "name": student["name"],
-                "date": today,
-                "time_in": record["time_in"],
-                "time_out": current_time_str
-            }, include_self=True)
-
-        return jsonify({
-            "record": {
-                "usn": student["usn"],
-                "name": student["name"],
-                "date": today,
-                "time_in": record["time_in"],
-                "time_out": current_time_str
-            }
-        }), 200
+    # Stream the finished workbook from disk; the temp dir goes once it's sent
+    response = Response(
+        file_chunks(path),
+        mimetype=XLSX_MIMETYPE,
+        headers={
+            "Content-Disposition": f'attachment; filename="{scope.filename("xlsx")}"',
+            "Content-Length": str(os.path.getsize(path)),
+        },
+    )
+    response.call_on_close(cleanup)
+    return response
 
-    else:
-        conn.close()
-        return jsonify({"error": "Invalid action"}), 400
 
-# --------------------------
-# Export Attendance to Excel
-# --------------------------
-@bp.route("/export_excel/<int:event_id>")
+@bp.route("/export_csv")
+@bp.route("/export_csv/<int:event_id>")
 @login_required
-def export_excel(event_id):
+def export_csv(event_id=None):
+    scope = export_scope(event_id)
     conn = get_db_connection()
     cur = conn.cursor()
-    cur.execute("""
-        SELECT ea.usn, si.name, ea.date, ea.time_in, ea.time_out
-        FROM event_attendance ea
-        JOIN student_info si ON ea.usn = si.usn
-        WHERE ea.event_id = ?
-        ORDER BY si.name
-    """, (event_id,))
-    rows = cur.fetchall()
-    conn.close()
-
-    if not rows:
+    first, rows = open_export(cur, scope)
+    if first is None:
+        conn.close()
         flash("⚠ No attendance records to export.", "warning")
         return redirect(url_for("event.event"))
 
-    # Convert to DataFrame
-    df = pd.DataFrame(rows, columns=["USN", "Name", "Date", "Time In", "Time Out"])
-
-    # Save to in-memory Excel with formatting
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, index=False, sheet_name="Attendance")
-        workbook = writer.book
-        worksheet = writer.sheets["Attendance"]
-
-        # Header formatting
-        header_format = workbook.add_format({
-            'bold': True,
-            'bg_color': '#2E2E2E',
-            'font_color': 'white',
-            'border': 1
-        })
-        for col_num, value in enumerate(df.columns.values):
-            worksheet.write(0, col_num, value, header_format)
-            worksheet.set_column(col_num, col_num, 20)
-
-        # Highlight late Time In cells
-        late_format = workbook.add_format({
-            'bg_color': '#FFA500',
-            'font_color': 'black'
-        })
-        for row_num, value in enumerate(df['Time In'], start=1):
-            if value == 'Late':
-                worksheet.write(row_num, 3, value, late_format)  # column 3 = "Time In"
-
-    output.seek(0)
-    filename = f"Attendance_Event_{event_id}.xlsx"
-    return send_file(output, download_name=filename, as_attachment=True)
+    # The connection stays checked out while the body streams
+    response = Response(
+        stream_with_context(csv_chunks(scope.columns, first, rows)),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{scope.filename("csv")}"'},
+    )
+    response.call_on_close(conn.close)
+    return response
@@ -0,0 +1,72 @@
+import os
+from flask import Blueprint, request, redirect, url_for, flash, jsonify, session, send_file
+from flask_socketio import SocketIO
+from app.models import get_db_connection
+from app.reports import report_jobs, DONE
+from app.realtime import EVENTS_ROOM
+
+bp = Blueprint("reports", __name__, template_folder="../templates")
+
+socketio = None  # placeholder, will be injected from app
+
+def set_socketio(sio: SocketIO):
+    global socketio
+    socketio = sio
+
+# --------------------------
+# SESSION CHECK DECORATOR
+# --------------------------
+def login_required(func):
+    from functools import wraps
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if "user_id" not in session:
+            flash("⚠️ Please login first.", "warning")
+            return redirect(url_for("auth.login"))
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def emit_progress(job):
+    if socketio:
+        socketio.emit("report_progress", job.to_dict(), to=EVENTS_ROOM)
+
+# --------------------------
+# Start (or reuse) a semester report
+# --------------------------
+@bp.route("/reports/semester", methods=["POST"])
+@login_required
+def start_semester_report():
+    data = request.get_json(silent=True) or request.form
+    semester = (data.get("semester") or "").strip()
+    if not semester:
+        return jsonify({"error": "Semester is required"}), 400
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    job = report_jobs.start(cur, semester, on_update=emit_progress)
+    conn.close()
+    return jsonify({"job": job.to_dict()}), 202 if job.status != DONE else 200
+
+# --------------------------
+# Poll a report job
+# --------------------------
+@bp.route("/reports/<job_id>")
+@login_required
+def report_status(job_id):
+    job = report_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Report not found"}), 404
+    return jsonify({"job": job.to_dict()})
+
+# --------------------------
+# Download a finished report
+# --------------------------
+@bp.route("/reports/<job_id>/download")
+@login_required
+def download_report(job_id):
+    job = report_jobs.get(job_id)
+    if not job or job.status != DONE or not os.path.exists(job.path):
+        flash("⚠ Report is no longer available, please generate it again.", "warning")
+        return redirect(url_for("event.event"))
+    return send_file(job.path, download_name=f"Semester_Report_{job.semester}.xlsx", as_attachment=True)
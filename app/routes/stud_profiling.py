@@ -1,15 +1,16 @@
+import io
+import json
 import sqlite3
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, session
+import time
+from datetime import datetime
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, session, Response, stream_with_context
+from app.models import get_db_connection
+from app.offload import run_blocking
+from app.cluster import invalidate_students, clear_roster, forget_student
+from app.roster_import import read_sheets, normalize_sheet, insert_rows, combine_sheets, diff_roster, apply_diff
 
 bp = Blueprint("stud_profiling", __name__, template_folder="../templates")
 
-DB_PATH = "osas_attendance.db"
-
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
 # --------------------------
 # SESSION CHECK DECORATOR
 # --------------------------
@@ -29,13 +30,62 @@ def login_required(func):
 @bp.route("/stud_list")
 @login_required
 def stud_list():
+    # Rows are fetched page by page from /stud_list/search
     conn = get_db_connection()
     cur = conn.cursor()
-    cur.execute("SELECT usn, name, course, contact FROM student_info")
-    students = cur.fetchall()
+    cur.execute("SELECT DISTINCT course FROM student_info ORDER BY course")
+    courses = [row["course"] for row in cur.fetchall()]
     conn.close()
-    students_list = [dict(row) for row in students]
-    return render_template("stud_list.html", students=students_list, user_name=session.get("username", "Officer"))
+    return render_template("stud_list.html", courses=courses, user_name=session.get("username", "Officer"))
+
+# -------------------------
+# STUDENT SEARCH (JSON)
+# -------------------------
+SEARCH_PAGE_SIZE = 25
+MAX_SEARCH_PAGE_SIZE = 100
+
+def fts_prefix_query(text):
+    # Quote every term so user input can't inject FTS5 syntax; '*' makes it a prefix match
+    terms = [term.replace('"', '""') for term in text.split()]
+    return " ".join(f'"{term}"*' for term in terms)
+
+@bp.route("/stud_list/search")
+@login_required
+def search_students():
+    q = request.args.get("q", "").strip()
+    course = request.args.get("course", "").strip()
+    after_name = request.args.get("after_name")
+    after_usn = request.args.get("after_usn")
+    limit = min(request.args.get("limit", SEARCH_PAGE_SIZE, type=int) or SEARCH_PAGE_SIZE, MAX_SEARCH_PAGE_SIZE)
+
+    where, params = [], []
+    if q:
+        where.append("si.rowid IN (SELECT rowid FROM student_fts WHERE student_fts MATCH ?)")
+        params.append(fts_prefix_query(q))
+    if course:
+        where.append("si.course = ?")
+        params.append(course)
+    if after_name is not None and after_usn is not None:
+        where.append("(si.name, si.usn) > (?, ?)")
+        params.extend([after_name, after_usn])
+
+    sql = "SELECT si.usn, si.name, si.course, si.contact, si.retired_at FROM student_info si"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY si.name, si.usn LIMIT ?"
+    params.append(limit + 1)
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    rows = cur.fetchall()
+    conn.close()
+
+    students = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = {"after_name": students[-1]["name"], "after_usn": students[-1]["usn"]}
+    return jsonify({"students": students, "next_cursor": next_cursor})
 
 # -------------------------
 # STUDENT PROFILE
@@ -58,50 +108,7 @@ def stud_profiling():
         return "Student not found", 404
     student = dict(student)
 
-    # Fetch all valid events
-    cur.execute("SELECT id, event_name, event_date FROM events ORDER BY event_date DESC")
-    events_all = [dict(row) for row in cur.fetchall()]
-    total_events = len(events_all)
-
-    # Count attended events
-    cur.execute("""
-        SELECT COUNT(DISTINCT ea.event_id) as attended_count
-        FROM event_attendance ea
-        INNER JOIN events e ON ea.event_id = e.id
-        WHERE ea.usn=?
-          AND ea.time_in IS NOT NULL
-          AND ea.time_in != ''
-          AND ea.time_in != 'Absent'
-          AND ea.time_in != 'Late'
-    """, (usn,))
-    attended_count = cur.fetchone()["attended_count"]
-
-    # Count late events
-    cur.execute("""
-        SELECT COUNT(DISTINCT ea.event_id) as late_count
-        FROM event_attendance ea
-        INNER JOIN events e ON ea.event_id = e.id
-        WHERE ea.usn=?
-          AND ea.time_in = 'Late'
-    """, (usn,))
-    late_count = cur.fetchone()["late_count"]
-
-   # Count no timeout (only for existing events)
-    cur.execute("""
-        SELECT COUNT(*) as no_timeout_count
-        FROM event_attendance ea
-        JOIN events e ON ea.event_id = e.id
-        WHERE ea.usn = ?
-        AND (ea.time_in IS NOT NULL AND ea.time_in != '')  -- must have time_in
-        AND (ea.time_out IS NULL OR ea.time_out = '')      -- missing time_out
-    """, (usn,))
-
-    no_timeout_count = cur.fetchone()["no_timeout_count"]
-
-    # Missed events
-    missed_count = total_events - (attended_count + late_count)
-
-    # Build event history with proper status including no timeout
+    # Event history with status; the usn-leading index serves the join
     cur.execute("""
         SELECT e.id, e.event_name, e.event_date,
                ea.time_in, ea.time_out,
@@ -117,6 +124,23 @@ def stud_profiling():
     """, (usn,))
     event_history = [dict(row) for row in cur.fetchall()]
 
+    # All counters in one pass over the history
+    all_events, attended_events, late_events = set(), set(), set()
+    no_timeout_count = 0
+    for row in event_history:
+        all_events.add(row["id"])
+        if row["status"] == "Attended":
+            attended_events.add(row["id"])
+        elif row["status"] == "Late":
+            late_events.add(row["id"])
+        if row["time_in"] and not row["time_out"]:
+            no_timeout_count += 1
+
+    total_events = len(all_events)
+    attended_count = len(attended_events)
+    late_count = len(late_events)
+    missed_count = total_events - (attended_count + late_count)
+
     conn.close()
     return render_template(
         "stud_profiling.html",
@@ -129,6 +153,43 @@ def stud_profiling():
         user_name=session.get("username", "Officer")
     )
 
+# -------------------------
+# AT-RISK STUDENTS (JSON)
+# -------------------------
+@bp.route("/stud_list/at_risk")
+@login_required
+def at_risk_students():
+    # Served from the student_stats rollup, so it never rescans event_attendance
+    min_missed = request.args.get("min_missed", 3, type=int)
+    course = request.args.get("course", "").strip()
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) FROM events")
+    total_events = cur.fetchone()[0]
+
+    sql = """
+        SELECT si.usn, si.name, si.course,
+               IFNULL(ss.present, 0) AS attended,
+               IFNULL(ss.late, 0) AS late,
+               IFNULL(ss.no_time_out, 0) AS no_timeout,
+               ? - IFNULL(ss.present, 0) - IFNULL(ss.late, 0) AS missed
+        FROM student_info si
+        LEFT JOIN student_stats ss ON ss.usn = si.usn
+        WHERE si.retired_at IS NULL
+          AND ? - IFNULL(ss.present, 0) - IFNULL(ss.late, 0) >= ?
+    """
+    params = [total_events, total_events, min_missed]
+    if course:
+        sql += " AND si.course = ?"
+        params.append(course)
+    sql += " ORDER BY missed DESC, si.name"
+    cur.execute(sql, params)
+    students = [dict(row) for row in cur.fetchall()]
+    conn.close()
+
+    return jsonify({"total_events": total_events, "min_missed": min_missed, "students": students})
+
 # -------------------------
 # ADD STUDENT
 # -------------------------
@@ -151,12 +212,146 @@ def add_student():
                     (usn, name, course, contact))
         conn.commit()
         conn.close()
+        invalidate_students(usn)
         return jsonify({"success": True, "message": f"Student {name} added successfully!", "category":"success"})
     except sqlite3.IntegrityError:
         return jsonify({"success": False, "message": "USN already exists.", "category":"error"})
     except Exception as e:
         return jsonify({"success": False, "message": str(e), "category":"error"})
 
+# -------------------------
+# IMPORT / SYNC ROSTER WORKBOOK
+# -------------------------
+# Both stream one JSON line per parsed sheet, then a final summary line, so
+# the page can show progress while a large workbook is processed.
+def uploaded_workbook():
+    """Return (workbook, None) or (None, error response) for the posted file."""
+    if session.get("user_type") == "officer":
+        return None, (jsonify({"error": "Only admins can import the roster."}), 403)
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        return None, (jsonify({"error": "No file uploaded."}), 400)
+    # The upload is closed once the view returns, before the body streams
+    return io.BytesIO(upload.read()), None
+
+
+def parse_workbook(workbook):
+    """Parse every sheet off the hub, yielding (progress, rows or None)."""
+    sheets = run_blocking(lambda: list(read_sheets(workbook)))
+    for index, (sheet, parse) in enumerate(sheets, start=1):
+        try:
+            rows, blank, errors = run_blocking(lambda: normalize_sheet(parse(), sheet))
+        except Exception as e:
+            rows, blank, errors = None, 0, [str(e)]
+        yield {
+            "sheet": sheet, "index": index, "sheets": len(sheets),
+            "rows": 0 if rows is None else len(rows), "blank": blank, "errors": errors,
+        }, rows
+
+
+def ndjson(payload):
+    return json.dumps(payload) + "\n"
+
+
+@bp.route("/stud_list/import", methods=["POST"])
+@login_required
+def import_students():
+    workbook, error = uploaded_workbook()
+    if error:
+        return error
+
+    def generate():
+        started = time.perf_counter()
+        parsed = []
+        try:
+            for progress, rows in parse_workbook(workbook):
+                if rows is not None and len(rows):
+                    parsed.append((progress["sheet"], rows))
+                yield ndjson(progress)
+        except Exception as e:
+            yield ndjson({"error": f"Could not read workbook: {e}"})
+            return
+
+        # All sheets in one transaction: a failed import leaves the roster as it was
+        results = []
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            for sheet, rows in parsed:
+                inserted = insert_rows(cur, rows)
+                results.append({"sheet": sheet, "inserted": inserted, "existing": len(rows) - inserted})
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            yield ndjson({"error": f"Import failed, nothing was saved: {e}"})
+            return
+        finally:
+            conn.close()
+
+        clear_roster()
+        yield ndjson({
+            "done": True,
+            "sheets": results,
+            "inserted": sum(r["inserted"] for r in results),
+            "existing": sum(r["existing"] for r in results),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000),
+        })
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+# Compares the workbook against the stored roster and, with apply=1, writes
+# only the inserts, changed rows and (with retire=1) retirements of students
+# missing from the workbook. Without apply=1 it is a dry run.
+@bp.route("/stud_list/sync", methods=["POST"])
+@login_required
+def sync_students():
+    workbook, error = uploaded_workbook()
+    if error:
+        return error
+    retire = request.form.get("retire") == "1"
+    apply = request.form.get("apply") == "1"
+
+    def generate():
+        started = time.perf_counter()
+        frames = []
+        try:
+            for progress, rows in parse_workbook(workbook):
+                if rows is not None and len(rows):
+                    frames.append(rows)
+                yield ndjson(progress)
+        except Exception as e:
+            yield ndjson({"error": f"Could not read workbook: {e}"})
+            return
+        rows, errors = run_blocking(combine_sheets, frames)
+
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            diff = run_blocking(diff_roster, cur, rows, retire)
+            if apply:
+                apply_diff(cur, diff, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                conn.commit()
+        except Exception as e:
+            conn.rollback()
+            yield ndjson({"error": f"Sync failed, nothing was saved: {e}"})
+            return
+        finally:
+            conn.close()
+
+        if apply:
+            clear_roster()
+        yield ndjson({
+            "done": True,
+            "dry_run": not apply,
+            "retire": retire,
+            "errors": errors,
+            **diff.summary(),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000),
+        })
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
 # -------------------------
 # UPDATE STUDENT
 # -------------------------
@@ -177,9 +372,11 @@ def update_student(usn):
         cur.execute("UPDATE student_info SET name=?, course=?, contact=? WHERE usn=?",
                     (name, course, contact, usn))
         if cur.rowcount == 0:
+            conn.close()
             return jsonify({"success": False, "message": "Student not found.", "category":"error"})
         conn.commit()
         conn.close()
+        invalidate_students(usn)
         return jsonify({"success": True, "message": f"Student {name} updated successfully!", "category":"success"})
     except Exception as e:
         return jsonify({"success": False, "message": str(e), "category":"error"})
@@ -195,9 +392,12 @@ def delete_student(usn):
         cur = conn.cursor()
         cur.execute("DELETE FROM student_info WHERE usn=?", (usn,))
         if cur.rowcount == 0:
+            conn.close()
             return jsonify({"success": False, "message": "Student not found.", "category":"error"})
         conn.commit()
         conn.close()
+        invalidate_students(usn)
+        forget_student(usn)
         return jsonify({"success": True, "message": f"Student {usn} deleted successfully!", "category":"success"})
     except Exception as e:
         return jsonify({"success": False, "message": str(e), "category":"error"})
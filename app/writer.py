@@ -0,0 +1,134 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from app.models import get_db_connection
+
+# --------------------------
+# Single-writer group-commit queue for attendance writes
+# --------------------------
+# Scan handlers submit a job (a callable taking a cursor) and wait on a
+# Future. One writer drains the queue and commits up to MAX_BATCH jobs, or
+# whatever arrived within MAX_WAIT seconds, in a single transaction, so
+# concurrent scanners share one fsync instead of queueing on the write lock.
+
+MAX_BATCH = 64
+MAX_WAIT = 0.005
+MAX_DEPTH = 1000
+RETRY_AFTER = 1  # seconds, sent with 503 when the queue is full
+
+
+class QueueFull(Exception):
+    pass
+
+
+class ScanWriter:
+    def __init__(self, max_batch=MAX_BATCH, max_wait=MAX_WAIT, max_depth=MAX_DEPTH):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_depth = max_depth
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        # metrics
+        self.commits = 0
+        self.jobs = 0
+        self.rejected = 0
+        self.max_depth_seen = 0
+        self.last_commit_ms = 0.0
+        self.max_commit_ms = 0.0
+        self._total_commit_ms = 0.0
+
+    def submit(self, job):
+        """Queue job(cur) for the next group commit and return its Future."""
+        depth = self._queue.qsize()
+        if depth >= self.max_depth:
+            self.rejected += 1
+            raise QueueFull()
+        self._ensure_started()
+        future = Future()
+        self._queue.put((job, future))
+        self.max_depth_seen = max(self.max_depth_seen, depth + 1)
+        return future
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="scan-writer", daemon=True)
+                    self._thread.start()
+
+    def _next_group(self):
+        group = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(group) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                group.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return group
+
+    def _run(self):
+        while True:
+            group = self._next_group()
+            try:
+                self._commit_group(group)
+            except Exception as e:
+                for _, future in group:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _commit_group(self, group):
+        started = time.perf_counter()
+        conn = get_db_connection()
+        try:
+            cur = conn.cursor()
+            # Explicit BEGIN so releasing a job's savepoint doesn't commit on its own
+            cur.execute("BEGIN IMMEDIATE")
+            results = []
+            for job, future in group:
+                # A savepoint per job keeps one failing scan from undoing the group
+                cur.execute("SAVEPOINT scan_job")
+                try:
+                    results.append((future, job(cur), None))
+                    cur.execute("RELEASE scan_job")
+                except Exception as e:
+                    cur.execute("ROLLBACK TO scan_job")
+                    cur.execute("RELEASE scan_job")
+                    results.append((future, None, e))
+            conn.commit()
+        finally:
+            conn.close()
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.commits += 1
+        self.jobs += len(group)
+        self.last_commit_ms = elapsed_ms
+        self.max_commit_ms = max(self.max_commit_ms, elapsed_ms)
+        self._total_commit_ms += elapsed_ms
+
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_depth_seen,
+            "commits": self.commits,
+            "jobs": self.jobs,
+            "rejected": self.rejected,
+            "avg_group_size": round(self.jobs / self.commits, 2) if self.commits else 0,
+            "last_commit_ms": round(self.last_commit_ms, 2),
+            "max_commit_ms": round(self.max_commit_ms, 2),
+            "avg_commit_ms": round(self._total_commit_ms / self.commits, 2) if self.commits else 0,
+        }
+
+
+scan_writer = ScanWriter()
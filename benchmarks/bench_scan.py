@@ -0,0 +1,146 @@
+"""
+Scan throughput: connect-per-request (old) vs the pooled WAL connections in app.models.
+
+Replays the scan_attendance() query sequence against a throwaway database while a
+background thread keeps running the dashboard aggregate, the way an open dashboard
+does on event days.
+
+    python benchmarks/bench_scan.py --scans 3000
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import ConnectionPool
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_name TEXT NOT NULL,
+    event_date TEXT NOT NULL,
+    semester TEXT NOT NULL,
+    cutoff_time TEXT
+);
+CREATE TABLE IF NOT EXISTS student_info (
+    usn TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    course TEXT NOT NULL,
+    contact TEXT
+);
+CREATE TABLE IF NOT EXISTS event_attendance (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_id INTEGER NOT NULL,
+    usn TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time_in TEXT,
+    time_out TEXT,
+    FOREIGN KEY (event_id) REFERENCES events (id) ON DELETE CASCADE,
+    FOREIGN KEY (usn) REFERENCES student_info (usn) ON DELETE CASCADE
+);
+"""
+
+
+def seed(path, students):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.execute(
+        "INSERT INTO events (event_name, event_date, semester, cutoff_time) VALUES ('Bench', '2025-01-01', '1st', '23:59')"
+    )
+    conn.executemany(
+        "INSERT INTO student_info (usn, name, course, contact) VALUES (?, ?, 'BSCS', 'N/A')",
+        ((str(100000 + i), f"Student {i}") for i in range(students)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def old_connect(path):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def scan_once(conn, usn, event_id=1):
+    cur = conn.cursor()
+    cur.execute("SELECT usn, name FROM student_info WHERE usn=?", (usn,))
+    cur.fetchone()
+    cur.execute("SELECT event_date, cutoff_time FROM events WHERE id=?", (event_id,))
+    cur.fetchone()
+    cur.execute(
+        "SELECT * FROM event_attendance WHERE usn=? AND event_id=? AND date=?",
+        (usn, event_id, "2025-01-01"),
+    )
+    if cur.fetchone() is None:
+        cur.execute(
+            "INSERT INTO event_attendance (event_id, usn, date, time_in) VALUES (?, ?, ?, ?)",
+            (event_id, usn, "2025-01-01", "08:00"),
+        )
+    conn.commit()
+
+
+def dashboard_reader(get_conn, stop, counters):
+    while not stop.is_set():
+        conn = get_conn()
+        try:
+            conn.execute(
+                "SELECT SUM(CASE WHEN time_in = 'Late' THEN 1 ELSE 0 END) FROM event_attendance"
+            ).fetchone()
+            counters["reads"] += 1
+        except sqlite3.OperationalError:
+            counters["read_errors"] += 1
+        finally:
+            conn.close()
+
+
+def run(label, get_conn, scans, students):
+    stop = threading.Event()
+    counters = {"reads": 0, "read_errors": 0}
+    reader = threading.Thread(target=dashboard_reader, args=(get_conn, stop, counters))
+    reader.start()
+
+    errors = 0
+    started = time.perf_counter()
+    for i in range(scans):
+        conn = get_conn()
+        try:
+            scan_once(conn, str(100000 + i % students))
+        except sqlite3.OperationalError:
+            errors += 1
+        finally:
+            conn.close()
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    reader.join()
+    print(
+        f"{label:<28} {scans / elapsed:9.0f} scans/s   "
+        f"scan errors: {errors:<4} dashboard reads: {counters['reads']} ({counters['read_errors']} errors)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scans", type=int, default=3000)
+    parser.add_argument("--students", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        before = os.path.join(tmp, "before.db")
+        seed(before, args.students)
+        run("before: connect per scan", lambda: old_connect(before), args.scans, args.students)
+
+        after = os.path.join(tmp, "after.db")
+        seed(after, args.students)
+        pool = ConnectionPool(after)
+        run("after: pooled WAL", pool.acquire, args.scans, args.students)
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
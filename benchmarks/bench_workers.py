@@ -0,0 +1,162 @@
+"""
+Scan throughput with 1, 2, 4... eventlet workers sharing a Socket.IO message queue.
+
+For each worker count this starts a loopback broker in this process and the
+real app (run.py) in N child processes, each on its own port. Scanner
+threads are pinned to one worker apiece, the way a sticky load balancer
+pins a browser, and post time-ins for distinct students as fast as the
+server answers. A Socket.IO listener joined to the event's room on the
+first worker counts the attendance_updates it receives, to show scans
+handled by the other workers reach it through the queue.
+
+Throughput only scales with the cores available; SQLite still takes one
+writer at a time, so the per-worker group commits end up queueing on the
+database file's write lock.
+
+    python benchmarks/bench_workers.py --workers 1,2,4 --seconds 10
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_scan_latency import seed, serve, free_port, wait_for, client  # noqa: E402
+
+
+class RoomListener(threading.Thread):
+    """Minimal Engine.IO long-polling client that joins one event room."""
+
+    def __init__(self, base, event_id):
+        super().__init__(daemon=True)
+        self.opener = client(base)
+        self.url = base + "/socket.io/?EIO=4&transport=polling"
+        self.event_id = event_id
+        self.received = 0
+        self.stop = threading.Event()
+
+    def _get(self):
+        return self.opener.open(self.url, timeout=60).read().decode().split("\x1e")
+
+    def _post(self, packet):
+        self.opener.open(urllib.request.Request(self.url, packet.encode(), {"Content-Type": "text/plain"})).read()
+
+    def connect(self):
+        handshake = json.loads(self._get()[0][1:])
+        self.url += "&sid=" + handshake["sid"]
+        self._post("40")
+        self._post("421" + json.dumps(["join_event", {"event_id": self.event_id}]))
+        joined = False
+        while not joined:
+            for packet in self._get():
+                joined = joined or packet.startswith("431")
+        self.start()
+
+    def run(self):
+        while not self.stop.is_set():
+            try:
+                packets = self._get()
+            except OSError:
+                return
+            for packet in packets:
+                if packet == "2":
+                    self._post("3")
+                elif packet.startswith("42"):
+                    name, items = json.loads(packet[2:])
+                    if name == "attendance_updates":
+                        self.received += len(items)
+
+
+def scanner(base, usns, stop, done):
+    opener = client(base)
+    for usn in usns:
+        if stop.is_set():
+            return
+        payload = json.dumps({"barcode": usn, "action": "time_in", "event_id": 1}).encode()
+        req = urllib.request.Request(base + "/scan_attendance", payload, {"Content-Type": "application/json"})
+        opener.open(req).read()
+        done.append(usn)
+
+
+def run_workers(count, args):
+    from app.cluster import LoopbackBroker
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "workers.db")
+        seed(db, args.students, 1)
+        broker_port = LoopbackBroker(port=0).start()
+        env = dict(os.environ, OSAS_DB_PATH=db, OSAS_MESSAGE_QUEUE=f"loopback://127.0.0.1:{broker_port}")
+        ports = [free_port() for _ in range(count)]
+        procs = [
+            subprocess.Popen(
+                [sys.executable, __file__, "--serve", str(port)],
+                env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            for port in ports
+        ]
+        try:
+            for port in ports:
+                wait_for(port)
+            bases = [f"http://127.0.0.1:{port}" for port in ports]
+            listener = RoomListener(bases[0], 1)
+            listener.connect()
+
+            stop = threading.Event()
+            done = []
+            usns = [str(100000 + i) for i in range(args.students)]
+            threads = [
+                threading.Thread(target=scanner, args=(bases[i % count], usns[i::args.clients], stop, done))
+                for i in range(args.clients)
+            ]
+            started = time.perf_counter()
+            for t in threads:
+                t.start()
+            time.sleep(args.seconds)
+            stop.set()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - started
+            time.sleep(1)  # let the last coalesced frames arrive
+            listener.stop.set()
+        finally:
+            for proc in procs:
+                proc.terminate()
+            for proc in procs:
+                proc.wait()
+
+    print(
+        f"workers: {count:<3} scans: {len(done):<7} scans/s: {len(done) / elapsed:8.1f}   "
+        f"updates seen on worker 1: {listener.received}/{len(done)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--students", type=int, default=50000)
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    print(f"{os.cpu_count()} CPU(s), {args.clients} scanner threads")
+    for count in args.workers.split(","):
+        run_workers(int(count), args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Scan latency while logins and dashboard renders run at the same time.
+
+Starts the real app (run.py) under eventlet in a child process for each
+OSAS_OFFLOAD mode, then drives it from plain OS threads in this process:
+one scanner posting time-outs back to back, plus login and dashboard
+threads. With offloading off, every password hash and dashboard query
+stalls the hub and the scanner's tail latency balloons. With tpool it
+should stay close to the idle baseline.
+
+    python benchmarks/load_scan_latency.py --seconds 10
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "benchmark-password"
+
+
+def seed(path, students, events):
+    sys.path.insert(0, ROOT)
+    import sqlite3
+    from werkzeug.security import generate_password_hash
+    from app.models import init_db
+
+    init_db(path)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO events (event_name, event_date, semester, cutoff_time) VALUES (?, '2025-01-01', '1st', '23:59')",
+        ((f"Event {i}",) for i in range(events)),
+    )
+    conn.executemany(
+        "INSERT INTO student_info (usn, name, course, contact) VALUES (?, ?, 'BSCS', 'N/A')",
+        ((str(100000 + i), f"Student {i}") for i in range(students)),
+    )
+    # History so the dashboard aggregates have something to chew on
+    conn.executemany(
+        "INSERT INTO event_attendance (event_id, usn, date, time_in, time_out) VALUES (?, ?, '2025-01-01', '08:00', '12:00')",
+        ((e + 2, str(100000 + s)) for e in range(events - 1) for s in range(0, students, 3)),
+    )
+    conn.execute(
+        "INSERT INTO user_accounts (username, password, user_type) VALUES ('admin', ?, 'admin')",
+        (generate_password_hash(PASSWORD),),
+    )
+    conn.commit()
+    conn.close()
+
+
+def serve(port):
+    sys.path.insert(0, ROOT)
+    import eventlet  # noqa: F401  (run.py monkey-patches on import)
+    import run
+    from eventlet import wsgi
+    wsgi.server(eventlet.listen(("127.0.0.1", port)), run.app, log_output=False)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(port, timeout=15):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def client(base):
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    login(opener, base)
+    return opener
+
+
+def login(opener, base):
+    body = urllib.parse.urlencode({"username": "admin", "password": PASSWORD, "user_type": "admin"}).encode()
+    opener.open(base + "/", body).read()
+
+
+def scanner(base, students, stop, latencies):
+    opener = client(base)
+    while not stop.is_set():
+        payload = json.dumps({
+            "barcode": str(100000 + random.randrange(students)),
+            "action": "time_out",
+            "event_id": 1,
+        }).encode()
+        req = urllib.request.Request(base + "/scan_attendance", payload, {"Content-Type": "application/json"})
+        started = time.perf_counter()
+        opener.open(req).read()
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+def background(base, kind, stop):
+    opener = client(base)
+    while not stop.is_set():
+        if kind == "login":
+            login(opener, base)
+        else:
+            opener.open(base + "/dashboard").read()
+
+
+def phase(base, students, seconds, logins, dashboards):
+    stop = threading.Event()
+    latencies = []
+    threads = [threading.Thread(target=scanner, args=(base, students, stop, latencies))]
+    threads += [threading.Thread(target=background, args=(base, "login", stop)) for _ in range(logins)]
+    threads += [threading.Thread(target=background, args=(base, "dashboard", stop)) for _ in range(dashboards)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    return {
+        "scans": len(latencies),
+        "p50": statistics.median(latencies),
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "max": latencies[-1],
+    }
+
+
+def run_mode(mode, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "load.db")
+        seed(db, args.students, args.events)
+        port = free_port()
+        env = dict(os.environ, OSAS_DB_PATH=db, OSAS_OFFLOAD=mode)
+        proc = subprocess.Popen(
+            [sys.executable, __file__, "--serve", str(port)],
+            env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for(port)
+            base = f"http://127.0.0.1:{port}"
+            idle = phase(base, args.students, args.seconds, 0, 0)
+            loaded = phase(base, args.students, args.seconds, args.logins, args.dashboards)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    for label, r in (("idle", idle), ("logins+dashboard", loaded)):
+        print(
+            f"{mode:<7} {label:<17} scans: {r['scans']:<6} "
+            f"p50: {r['p50']:7.1f} ms   p95: {r['p95']:7.1f} ms   max: {r['max']:7.1f} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=60)
+    parser.add_argument("--logins", type=int, default=4)
+    parser.add_argument("--dashboards", type=int, default=2)
+    parser.add_argument("--modes", default="inline,tpool")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    for mode in args.modes.split(","):
+        run_mode(mode, args)
+
+
+if __name__ == "__main__":
+    main()
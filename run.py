@@ -3,28 +3,59 @@ import eventlet
 eventlet.monkey_patch()
 
 # 2️⃣ Now import the rest
+import argparse
+import os
 from flask import Flask
 from flask_socketio import SocketIO
 from app.routes.dashboard import bp as dashboard_bp
 from app.routes.events import bp as events_bp, set_socketio
 from app.routes.auth import bp as auth_bp
 from app.routes.stud_profiling import bp as stud_profiling_bp
+from app.routes.reports import bp as reports_bp, set_socketio as set_reports_socketio
+from app.models import init_db
+from app.realtime import broadcaster, register_handlers
+from app.cluster import create_manager, subscribe, run_workers
+
+# Shared Socket.IO message queue for multi-worker mode (redis://... or loopback://host:port)
+MESSAGE_QUEUE = os.environ.get("OSAS_MESSAGE_QUEUE")
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = "supersecret"
 
-# Initialize SocketIO with Eventlet
-socketio = SocketIO(app, cors_allowed_origins="*")
+# Apply pending schema migrations (indexes, added columns)
+init_db()
+
+# Initialize SocketIO with Eventlet; with a message queue, emits reach clients on every worker
+if MESSAGE_QUEUE:
+    socketio = SocketIO(app, cors_allowed_origins="*", client_manager=create_manager(MESSAGE_QUEUE))
+    subscribe(socketio)
+else:
+    socketio = SocketIO(app, cors_allowed_origins="*")
 
 # Inject socketio into events blueprint
 set_socketio(socketio)
+set_reports_socketio(socketio)
+broadcaster.init_app(socketio)
+register_handlers(socketio)
 
 # Register blueprints
 app.register_blueprint(dashboard_bp)
 app.register_blueprint(events_bp)
 app.register_blueprint(auth_bp)
 app.register_blueprint(stud_profiling_bp)
+app.register_blueprint(reports_bp)
 
 
 if __name__ == "__main__":
-    socketio.run(app, host="0.0.0.0", port=5050, debug=True)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5050)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="start N worker processes on ports PORT..PORT+N-1 (put a sticky load balancer in front)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        run_workers(__file__, args.workers, args.host, args.port, MESSAGE_QUEUE)
+    else:
+        socketio.run(app, host=args.host, port=args.port, debug=True, use_reloader=not args.worker)